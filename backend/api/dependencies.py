@@ -0,0 +1,16 @@
+from backend.services.ai_service import AIService
+from backend.services.court_listener import CourtListenerService
+from backend.services.payment_service import FlowgladService
+from backend.services.http_clients import http_clients, OPENROUTER, COURTLISTENER, FLOWGLAD
+
+# Services are cheap wrappers around the app-lifetime connection pools,
+# so each request gets its own instance but shares the underlying client.
+
+async def get_ai_service():
+    return AIService(client=http_clients.get(OPENROUTER))
+
+async def get_court_service():
+    return CourtListenerService(client=http_clients.get(COURTLISTENER))
+
+async def get_payment_service():
+    return FlowgladService(client=http_clients.get(FLOWGLAD))
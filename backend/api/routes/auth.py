@@ -1,12 +1,12 @@
 from fastapi import APIRouter, HTTPException, Header, Depends
-from backend.services.auth_service import AuthService
+from backend.services.auth_service import AuthService, get_shared_auth_service
 from typing import Optional
 import json
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 async def get_auth_service():
-    return AuthService()
+    return get_shared_auth_service()
 
 async def get_current_user(
     authorization: Optional[str] = Header(None),
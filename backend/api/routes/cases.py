@@ -1,17 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import Response
 from backend.models.case import CaseSearchRequest, LegalCase
-from backend.services.court_listener import CourtListenerService
-from typing import List
+from backend.services.court_listener import (
+    CourtListenerService, search_cache, get_opinion_store,
+    search_flight, opinion_flight, details_flight
+)
+from backend.api.dependencies import get_court_service
+from typing import List, Optional
+import asyncio
 
 router = APIRouter(prefix="/cases", tags=["cases"])
 
-async def get_court_service():
-    service = CourtListenerService()
-    try:
-        yield service
-    finally:
-        await service.close()
-
 @router.post("/search", response_model=List[LegalCase])
 async def search_cases(
     request: CaseSearchRequest,
@@ -24,16 +23,42 @@ async def search_cases(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching cases: {str(e)}")
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get CourtListener cache and request-coalescing counters"""
+    opinions = await asyncio.to_thread(get_opinion_store().stats)
+    return {
+        "search": search_cache.stats(),
+        "opinions": opinions,
+        "flights": {
+            flight.name: flight.stats()
+            for flight in (search_flight, opinion_flight, details_flight)
+        }
+    }
+
 @router.get("/{case_id}")
 async def get_case_details(
     case_id: str,
+    accept_encoding: Optional[str] = Header(None),
     court_service: CourtListenerService = Depends(get_court_service)
 ):
     """Get detailed case information"""
     try:
-        case_details = await court_service.get_case_details(case_id)
+        case_details = await court_service.get_case_details_raw(case_id)
         if not case_details:
             raise HTTPException(status_code=404, detail="Case not found")
-        return case_details
+        
+        # Serve the stored bytes as-is; no JSON parse/re-serialize round trip
+        headers = {"Vary": "Accept-Encoding"}
+        if case_details.etag:
+            headers["ETag"] = case_details.etag
+        if accept_encoding and "gzip" in accept_encoding:
+            headers["Content-Encoding"] = "gzip"
+            body = case_details.body_gzip
+        else:
+            body = case_details.body
+        return Response(content=body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching case: {str(e)}")
\ No newline at end of file
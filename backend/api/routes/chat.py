@@ -1,39 +1,93 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from backend.models.chat import ChatRequest, ChatResponse, ChatMessage
-from backend.services.ai_service import AIService
+from backend.services.ai_service import AIService, DemandNoticeDetector
 from backend.services.court_listener import CourtListenerService
 from backend.services.honcho_service import HonchoService
 from backend.services.honcho_service import get_memory_service
+from backend.api.dependencies import get_ai_service, get_court_service
+from backend.config.settings import settings
 from datetime import datetime
+from typing import List
+import asyncio
+import json
 import uuid
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 # Dependency injection
-async def get_ai_service():
-    service = AIService()
-    try:
-        yield service
-    finally:
-        await service.close()
+async def get_honcho_service():
+    # One memory service per process; it lives for the app lifespan
+    return get_memory_service()
 
-async def get_court_service():
-    service = CourtListenerService()
+async def _run_stage(stage: str, coro, timeout: float, default):
+    """Run one pipeline stage with its own timeout, degrading to a default"""
     try:
-        yield service
-    finally:
-        await service.close()
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"Chat pipeline stage '{stage}' timed out after {timeout}s")
+        return default
+    except Exception as e:
+        print(f"Chat pipeline stage '{stage}' failed: {e}")
+        return default
 
-async def get_honcho_service():
-    service = get_memory_service()
-    try:
-        yield service
-    finally:
-        await service.close()
+async def _gather_context(
+    request: ChatRequest,
+    court_service: CourtListenerService,
+    honcho_service: HonchoService
+):
+    """Stage 1: resolve the session, case-law search and history lookup concurrently"""
+    
+    async def resolve_history():
+        # A brand-new session has no history, so only the session id is needed
+        if not request.session_id:
+            # Same id format as the memory services; Honcho creates the session on first write
+            fallback_id = f"session_{request.user_id}_{int(datetime.now().timestamp())}"
+            session_id = await _run_stage(
+                "session",
+                honcho_service.create_session(request.user_id),
+                settings.chat_history_timeout,
+                fallback_id
+            )
+            return session_id, []
+        history = await _run_stage(
+            "history",
+            honcho_service.get_chat_history(request.user_id, request.session_id, limit=10),
+            settings.chat_history_timeout,
+            []
+        )
+        return request.session_id, history
+    
+    # Search for relevant NY cases (done in background, not shown to user)
+    retrieval = _run_stage(
+        "retrieval",
+        court_service.search_cases(request.message, limit=3),
+        settings.chat_retrieval_timeout,
+        []
+    )
+    relevant_cases, (session_id, chat_history) = await asyncio.gather(retrieval, resolve_history())
+    return session_id, chat_history, relevant_cases
+
+async def _persist_turn(
+    honcho_service: HonchoService,
+    user_id: str,
+    session_id: str,
+    messages: List[ChatMessage]
+):
+    """Stage 3: save the turn after the response has been sent, keeping message order"""
+    for message in messages:
+        await _run_stage(
+            "persist",
+            honcho_service.add_message(user_id, session_id, message),
+            settings.chat_persist_timeout,
+            None
+        )
 
 @router.post("/message", response_model=ChatResponse)
 async def send_message(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     ai_service: AIService = Depends(get_ai_service),
     court_service: CourtListenerService = Depends(get_court_service),
     honcho_service: HonchoService = Depends(get_honcho_service)
@@ -41,39 +95,29 @@ async def send_message(
     """Process user message and return AI response with relevant NY case law"""
     
     try:
-        # Create session if not provided
-        session_id = request.session_id
-        if not session_id:
-            session_id = await honcho_service.create_session(request.user_id)
-        
-        # Search for relevant NY cases (done in background, not shown to user)
-        relevant_cases = await court_service.search_cases(request.message, limit=3)
+        user_message = ChatMessage(
+            role="user",
+            content=request.message,
+            timestamp=datetime.now()
+        )
         
-        # Get chat history for context
-        chat_history = await honcho_service.get_chat_history(
-            request.user_id, session_id, limit=10
+        session_id, chat_history, relevant_cases = await _gather_context(
+            request, court_service, honcho_service
         )
         
-        # Generate AI response
+        # Stage 2: generate AI response
         ai_result = await ai_service.generate_response(
             request.message, chat_history, relevant_cases
         )
         
-        # Save user message to history
-        user_message = ChatMessage(
-            role="user",
-            content=request.message,
-            timestamp=datetime.now()
-        )
-        await honcho_service.add_message(request.user_id, session_id, user_message)
-        
-        # Save AI response to history
         ai_message = ChatMessage(
             role="assistant",
             content=ai_result["response"],
             timestamp=datetime.now()
         )
-        await honcho_service.add_message(request.user_id, session_id, ai_message)
+        background_tasks.add_task(
+            _persist_turn, honcho_service, request.user_id, session_id, [user_message, ai_message]
+        )
         
         # Return response (no relevant_cases in response since we removed sidebar)
         return ChatResponse(
@@ -86,6 +130,77 @@ async def send_message(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/stream")
+async def stream_message(
+    request: ChatRequest,
+    ai_service: AIService = Depends(get_ai_service),
+    court_service: CourtListenerService = Depends(get_court_service),
+    honcho_service: HonchoService = Depends(get_honcho_service)
+):
+    """Process user message and stream the AI response token by token as SSE"""
+    
+    user_message = ChatMessage(
+        role="user",
+        content=request.message,
+        timestamp=datetime.now()
+    )
+    
+    try:
+        session_id, chat_history, relevant_cases = await _gather_context(
+            request, court_service, honcho_service
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
+    
+    parts: List[str] = []
+    
+    async def event_stream():
+        detector = DemandNoticeDetector()
+        yield _sse("session", {"session_id": session_id})
+        
+        try:
+            async for delta in ai_service.stream_response(
+                request.message, chat_history, relevant_cases
+            ):
+                parts.append(delta)
+                yield _sse("token", {"text": delta})
+                
+                # Tell the client as soon as the button can be shown
+                if not detector.detected and detector.feed(delta):
+                    yield _sse("demand_notice", {"can_generate_demand_notice": True})
+        except Exception as e:
+            print(f"OpenRouter streaming error: {e}")
+            if not parts:
+                fallback = "I apologize, but I'm experiencing technical difficulties. Please try again later."
+                parts.append(fallback)
+                yield _sse("token", {"text": fallback})
+            yield _sse("error", {"detail": "Response stream interrupted"})
+        
+        yield _sse("done", {
+            "session_id": session_id,
+            "can_generate_demand_notice": detector.detected
+        })
+    
+    async def persist():
+        # Runs once the stream has finished, with the complete response text
+        ai_message = ChatMessage(
+            role="assistant",
+            content="".join(parts),
+            timestamp=datetime.now()
+        )
+        await _persist_turn(honcho_service, request.user_id, session_id, [user_message, ai_message])
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(persist)
+    )
+
 @router.get("/history/{user_id}/{session_id}")
 async def get_chat_history(
     user_id: str,
@@ -1,20 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import Response, PlainTextResponse
-from backend.models.demand_notice import DemandNoticeRequest, DemandNoticeResponse
-from backend.services.demand_notice_generator import DemandNoticeGenerator
-from backend.services.honcho_service import get_memory_service
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, File, Form, UploadFile
+from fastapi.responses import Response, PlainTextResponse, FileResponse, StreamingResponse
+from backend.models.demand_notice import (
+    DemandNoticeRequest, DemandNoticeResponse, DemandNoticeJobRequest, DemandNoticeJob
+)
+from backend.services.demand_notice_generator import get_demand_notice_generator
 from backend.services.court_listener import CourtListenerService
+from backend.services.pdf_renderer import pdf_render_pool, PDFPoolSaturated
+from backend.services.pdf_cache import get_pdf_cache, content_key
+from backend.services.notice_jobs import (
+    get_notice_job_queue, find_case_references, JobQueueFull, CallbackURLRejected, COMPLETE
+)
+from backend.services.bulk_notices import parse_csv, stream_notice_zip, check_bulk_size, BulkRequestError
+from backend.api.dependencies import get_court_service
+from backend.config.settings import settings
 from datetime import datetime
 
 router = APIRouter(prefix="/demand-notice", tags=["demand-notice"])
 
-async def get_court_service():
-    service = CourtListenerService()
-    try:
-        yield service
-    finally:
-        await service.close()
-
 @router.post("/generate", response_model=DemandNoticeResponse)
 async def generate_demand_notice(
     request: DemandNoticeRequest,
@@ -23,28 +27,11 @@ async def generate_demand_notice(
     """Generate a NYC Consumer Dispute demand notice"""
     
     try:
-        # Get recent conversation to understand the legal issue
-        memory_service = get_memory_service()
-        chat_history = await memory_service.get_chat_history(
-            request.user_id, request.session_id, limit=20
-        )
-        
-        # Extract key terms from conversation for case search
-        conversation_text = " ".join([msg.content for msg in chat_history if msg.role == "user"])
-        
-        # Search for relevant NY cases
-        relevant_cases = await court_service.search_cases(
-            f"NYC consumer protection {request.issue_description} {conversation_text}", limit=3
-        )
-        
-        # Prepare case references
-        case_references = [
-            f"{case.case_name} ({case.court})"
-            for case in relevant_cases
-        ]
+        # Search for relevant NY cases using the conversation so far
+        case_references = await find_case_references(request, court_service)
         
         # Generate the notice
-        generator = DemandNoticeGenerator()
+        generator = get_demand_notice_generator()
         notice_content = generator.generate_notice(request, case_references)
         
         # Generate filename
@@ -60,34 +47,66 @@ async def generate_demand_notice(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating demand notice: {str(e)}")
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
 @router.post("/generate-pdf")
-async def generate_demand_notice_pdf(request: DemandNoticeRequest):
+async def generate_demand_notice_pdf(
+    request: DemandNoticeRequest,
+    if_none_match: Optional[str] = Header(None)
+):
     """Generate and download demand notice as PDF"""
     try:
         # Generate the notice content first
-        generator = DemandNoticeGenerator()
+        generator = get_demand_notice_generator()
         notice_content = generator.generate_notice(request)
         
-        # Generate PDF
+        # PDFs are addressed by their markdown, so the hash is a strong validator
+        key = content_key(notice_content)
+        etag = f'"{key}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"nyc_demand_notice_{timestamp}.pdf"
-        pdf_content = generator.generate_pdf(notice_content, filename)
         
-        # Return PDF as download
-        return Response(
-            content=pdf_content,
+        cache = get_pdf_cache()
+        path = await asyncio.to_thread(cache.get, key)
+        if path is None:
+            pdf_content = await pdf_render_pool.render(notice_content)
+            path = await asyncio.to_thread(cache.put, key, pdf_content)
+        
+        # Stream the cached file as a download
+        return FileResponse(
+            path,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            filename=filename,
+            headers=headers
         )
         
+    except PDFPoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="PDF rendering is busy, please retry shortly",
+            headers={"Retry-After": str(settings.pdf_retry_after)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
+@router.get("/pdf-stats")
+async def get_pdf_stats():
+    """Get PDF render pool and artifact cache metrics"""
+    return {**pdf_render_pool.stats(), "cache": get_pdf_cache().stats()}
+
 @router.post("/download-text")
 async def download_demand_notice_text(request: DemandNoticeRequest):
     """Download demand notice as text file"""
     try:
-        generator = DemandNoticeGenerator()
+        generator = get_demand_notice_generator()
         notice_content = generator.generate_notice(request)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -99,4 +118,129 @@ async def download_demand_notice_text(request: DemandNoticeRequest):
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error downloading notice: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error downloading notice: {str(e)}")
+
+@router.post("/statement-of-claim")
+async def download_statement_of_claim(request: DemandNoticeRequest):
+    """Download the NYC Small Claims statement of claim as a text file"""
+    try:
+        generator = get_demand_notice_generator()
+        claim_content = generator.generate_statement_of_claim(request)
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"nyc_statement_of_claim_{timestamp}.txt"
+        
+        return Response(
+            content=claim_content,
+            media_type="text/plain",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating statement of claim: {str(e)}")
+
+def _zip_response(requests: List[DemandNoticeRequest], court_service: CourtListenerService) -> StreamingResponse:
+    try:
+        check_bulk_size(requests)
+    except BulkRequestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return StreamingResponse(
+        stream_notice_zip(requests, court_service),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=nyc_demand_notices_{timestamp}.zip"}
+    )
+
+@router.post("/bulk")
+async def generate_bulk_demand_notices(
+    requests: List[DemandNoticeRequest],
+    court_service: CourtListenerService = Depends(get_court_service)
+):
+    """Generate many demand notices at once and download them as a ZIP of PDFs"""
+    return _zip_response(requests, court_service)
+
+@router.post("/bulk/csv")
+async def generate_bulk_demand_notices_csv(
+    file: UploadFile = File(...),
+    user_id: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    court_service: CourtListenerService = Depends(get_court_service)
+):
+    """Same as /bulk, from a CSV upload with one notice per row"""
+    # Form fields fill in columns a partner's spreadsheet usually won't have
+    defaults = {key: value for key, value in (("user_id", user_id), ("session_id", session_id)) if value}
+    try:
+        requests = parse_csv(await file.read(), defaults)
+    except BulkRequestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _zip_response(requests, court_service)
+
+@router.post("/jobs", status_code=202)
+async def create_demand_notice_job(request: DemandNoticeJobRequest):
+    """Queue demand notice generation; poll the returned status URL or wait for the callback"""
+    queue = get_notice_job_queue()
+    callback_url = str(request.callback_url) if request.callback_url else None
+    notice_request = DemandNoticeRequest(**request.model_dump(exclude={"callback_url"}))
+    try:
+        job_id = await queue.submit(notice_request, callback_url)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many demand notices in progress, please wait for one to finish"
+        )
+    except CallbackURLRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/demand-notice/jobs/{job_id}"
+    }
+
+@router.get("/jobs/{job_id}", response_model=DemandNoticeJob)
+async def get_demand_notice_job(job_id: str):
+    """Get job status and, once complete, the notice and its PDF link"""
+    job = await asyncio.to_thread(get_notice_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return DemandNoticeJob(
+        job_id=job_id,
+        status=job["status"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        result=job["result"],
+        error=job["error"],
+        pdf_url=f"/api/demand-notice/jobs/{job_id}/pdf" if job["status"] == COMPLETE else None
+    )
+
+@router.get("/jobs/{job_id}/pdf")
+async def download_demand_notice_job_pdf(job_id: str, if_none_match: Optional[str] = Header(None)):
+    """Download the PDF produced by a completed job"""
+    job = await asyncio.to_thread(get_notice_job_queue().store.get, job_id)
+    if job is None or job["status"] != COMPLETE:
+        raise HTTPException(status_code=404, detail="PDF not available")
+    
+    result = job["result"]
+    etag = f'"{result["pdf_key"]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        cache = get_pdf_cache()
+        path = await asyncio.to_thread(cache.get, result["pdf_key"])
+        if path is None:
+            # Evicted since the job ran; the stored notice renders to the same key
+            pdf_content = await pdf_render_pool.render(result["notice_content"])
+            path = await asyncio.to_thread(cache.put, result["pdf_key"], pdf_content)
+    except PDFPoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="PDF rendering is busy, please retry shortly",
+            headers={"Retry-After": str(settings.pdf_retry_after)}
+        )
+    
+    return FileResponse(path, media_type="application/pdf", filename=result["filename"], headers=headers)
+
+@router.get("/jobs-stats")
+async def get_job_stats():
+    """Get demand notice job queue metrics"""
+    return get_notice_job_queue().stats()
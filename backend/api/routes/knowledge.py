@@ -0,0 +1,28 @@
+import os
+from fastapi import APIRouter, Query
+from backend.models.knowledge import KnowledgeHit
+from backend.services.knowledge_base import get_knowledge_base, get_knowledge_retriever
+from typing import List
+
+router = APIRouter(prefix="/knowledge", tags=["knowledge"])
+
+@router.get("/search", response_model=List[KnowledgeHit])
+async def search_knowledge_base(q: str = Query(..., min_length=1), limit: int = Query(5, ge=1, le=20)):
+    """Search NYC Small Claims procedure notes (fees, filing steps, venues, service, FAQs)"""
+    # A few hundred microseconds of in-memory work, so it runs inline rather than in a thread
+    hits = get_knowledge_retriever().search(q, limit)
+    return [
+        KnowledgeHit(
+            heading=hit.chunk.heading,
+            source=hit.chunk.source,
+            text=hit.chunk.text,
+            file=os.path.basename(hit.chunk.path),
+            score=hit.score
+        )
+        for hit in hits
+    ]
+
+@router.get("/stats")
+async def get_knowledge_base_stats():
+    """Get knowledge base index size and rebuild count"""
+    return get_knowledge_base().stats()
@@ -1,32 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
-from backend.services.payment_service import FlowgladService
-from backend.services.auth_service import AuthService
-from backend.api.routes.auth import get_current_user
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from backend.services.payment_service import FlowgladService, verify_webhook_signature
+from backend.services.payment_store import get_payment_store, FINAL_STATUSES
+from backend.services.auth_service import AuthService, get_shared_auth_service
+from backend.api.routes.auth import get_current_user, get_auth_service
+from backend.api.dependencies import get_payment_service
 from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import json
 
 router = APIRouter(prefix="/payment", tags=["payment"])
 
 class PaymentRequest(BaseModel):
     success_url: str = "http://localhost:8000/payment/success"
     cancel_url: str = "http://localhost:8000/payment/cancel"
-
-async def get_payment_service():
-    service = FlowgladService()
-    try:
-        yield service
-    finally:
-        await service.close()
-
-async def get_auth_service():
-    service = AuthService()
-    try:
-        yield service
-    finally:
-        pass
+    request_id: Optional[str] = None  # Client-generated per purchase attempt; resend it on retries
 
 @router.post("/create-checkout")
 async def create_checkout_session(
     request: PaymentRequest,
+    idempotency_key: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     payment_service: FlowgladService = Depends(get_payment_service)
 ):
@@ -37,12 +30,21 @@ async def create_checkout_session(
             user_id=current_user["user_id"],
             user_email=current_user["email"],
             success_url=request.success_url,
-            cancel_url=request.cancel_url
+            cancel_url=request.cancel_url,
+            retry_token=idempotency_key or request.request_id
         )
         
         if not session:
             raise HTTPException(status_code=500, detail="Failed to create payment session")
         
+        # Remember who owns the session so webhooks and verification can be matched to it
+        await asyncio.to_thread(
+            get_payment_store().record,
+            session.get("id"),
+            session.get("status", "open"),
+            current_user["user_id"]
+        )
+        
         return {
             "checkout_url": session.get("url"),
             "session_id": session.get("id")
@@ -61,25 +63,93 @@ async def verify_payment(
     """Verify payment and return success status"""
     
     try:
-        payment_data = await payment_service.verify_payment(session_id)
+        store = get_payment_store()
+        record = await asyncio.to_thread(store.get, session_id)
         
-        if not payment_data:
+        if record and record["user_id"] and record["user_id"] != current_user["user_id"]:
             raise HTTPException(status_code=404, detail="Payment session not found")
         
-        # Log payment
-        await auth_service.log_payment(current_user["user_id"], {
-            "session_id": session_id,
-            "amount": 0.0,  # $0 for now
-            "currency": "usd",
-            "status": payment_data.get("status", "unknown"),
-            "metadata": {"product": "demand_notice"}
-        })
+        if record and record["status"] in FINAL_STATUSES:
+            # Settled by a webhook or an earlier check; no need to ask Flowglad again
+            status = record["status"]
+        else:
+            # Webhook not received yet: poll Flowglad once and keep the answer
+            payment_data = await payment_service.verify_payment(session_id)
+            
+            if not payment_data:
+                raise HTTPException(status_code=404, detail="Payment session not found")
+            
+            # Our checkouts carry the buyer in metadata; don't hand someone else's session to the caller
+            owner = (payment_data.get("metadata") or {}).get("user_id")
+            if owner != current_user["user_id"]:
+                raise HTTPException(status_code=404, detail="Payment session not found")
+            
+            # A webhook may have settled the session meanwhile; the stored status wins
+            status = await asyncio.to_thread(
+                store.record, session_id, payment_data.get("status", "unknown"), current_user["user_id"], payment_data
+            )
+        
+        await _log_payment_once(auth_service, current_user["user_id"], session_id, status)
         
         return {
-            "payment_status": payment_data.get("status"),
-            "paid": payment_data.get("status") == "complete",
+            "payment_status": status,
+            "paid": status == "complete",
             "session_id": session_id
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Verification error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Verification error: {str(e)}")
+
+async def _log_payment_once(auth_service: AuthService, user_id: str, session_id: str, status: str):
+    """Write a payments row only when a session's status changes"""
+    store = get_payment_store()
+    if not await asyncio.to_thread(store.claim_log, session_id, status):
+        return
+    
+    # Log payment
+    logged = await auth_service.log_payment(user_id, {
+        "session_id": session_id,
+        "amount": 0.0,  # $0 for now
+        "currency": "usd",
+        "status": status,
+        "metadata": {"product": "demand_notice"}
+    })
+    if not logged:
+        await asyncio.to_thread(store.release_log, session_id, status)
+
+@router.post("/webhook")
+async def flowglad_webhook(request: Request):
+    """Receive Flowglad checkout events and record payment state locally"""
+    payload = await request.body()
+    if not verify_webhook_signature(payload, request.headers):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+    
+    store = get_payment_store()
+    event_id = request.headers.get("webhook-id") or request.headers.get("svix-id")
+    try:
+        event = json.loads(payload)
+        data = event.get("data") or {}
+        checkout = data.get("object", data)
+        if not isinstance(checkout, dict):
+            raise ValueError("event data is not an object")
+    except (ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Malformed webhook payload")
+    session_id = checkout.get("id") or checkout.get("checkout_session_id")
+    status = checkout.get("status")
+    if not session_id or not status:
+        return {"received": True, "ignored": True}
+    
+    user_id = (checkout.get("metadata") or {}).get("user_id")
+    # The event id is stored with the state change, so a failure before this point lets Flowglad retry
+    status = await asyncio.to_thread(store.record, session_id, status, user_id, checkout, event_id)
+    if status is None:
+        # Redelivery of an event we already processed
+        return {"received": True, "duplicate": True}
+    
+    record = await asyncio.to_thread(store.get, session_id)
+    if record and record["user_id"]:
+        await _log_payment_once(get_shared_auth_service(), record["user_id"], session_id, status)
+    
+    return {"received": True}
@@ -11,6 +11,19 @@ class Settings(BaseSettings):
     supabase_url: str
     supabase_anon_key: str
     supabase_service_role_key: str
+    supabase_jwt_secret: Optional[str] = None  # Enables local HS256 token verification
+    supabase_jwt_audience: str = "authenticated"
+    
+    # Token verification cache
+    auth_cache_ttl: float = 300.0  # Never longer than the token's own expiry
+    auth_cache_max_entries: int = 10000
+    auth_jwks_cache_ttl: int = 3600
+    auth_check_revocation: bool = False  # Always confirm with Supabase after local checks
+    auth_revocation_cache_ttl: float = 5.0  # Cache lifetime when revocation checking is on
+    
+    # User profile cache
+    profile_cache_ttl: float = 300.0
+    profile_cache_max_entries: int = 10000
 
     # Flowglad Configuration
     flowglad_secret_key: str
@@ -25,11 +38,104 @@ class Settings(BaseSettings):
     # Honcho Configuration
     honcho_environment: str = "demo"  # "demo" or "production"
     
+    # Memory backend: "auto" (Honcho if installed, else in-memory), "honcho", "sqlite" or "memory"
+    memory_backend: str = "auto"
+    memory_sqlite_path: str = "var/memory.sqlite3"
+    honcho_max_workers: int = 8  # Threads running the blocking Honcho SDK
+    honcho_max_concurrency: int = 32  # Calls allowed in flight or queued for those threads
+    honcho_timeout: float = 10.0
+    
+    # Memory write-behind batching
+    memory_batch_size: int = 20
+    memory_flush_interval: float = 0.5  # Seconds a message may wait before its batch is flushed
+    
+    # Local in-memory history bounds
+    memory_history_max_messages: int = 50  # Largest history limit any route asks for
+    memory_max_sessions: int = 10000  # Idle sessions beyond this are evicted LRU
+    
     demand_notice_price: float = 0.0  # $0 for now
+    flowglad_price_id: Optional[str] = None  # Skip product/price lookup when set
+    flowglad_catalog_path: str = "var/flowglad_catalog.json"
+    flowglad_webhook_secret: Optional[str] = None  # "whsec_..." signing secret
+    flowglad_webhook_tolerance: int = 300  # Max webhook clock skew in seconds
+    payment_store_path: str = "var/payments.sqlite3"
 
     # AI Model
     ai_model: str = "moonshotai/kimi-k2:free"
     
+    # HTTP connection pooling (one shared client per upstream)
+    http2_enabled: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_timeout: float = 30.0
+    http_connect_timeout: float = 5.0
+    openrouter_max_connections: int = 50
+    courtlistener_max_connections: int = 10
+    flowglad_max_connections: int = 10
+    supabase_max_connections: int = 20
+    
+    # Chat pipeline stage timeouts (seconds)
+    chat_retrieval_timeout: float = 5.0
+    chat_history_timeout: float = 3.0
+    chat_persist_timeout: float = 10.0
+    
+    # CourtListener search cache
+    search_cache_max_entries: int = 512
+    search_cache_ttl: float = 3600.0  # Serve fresh for an hour
+    search_cache_stale_ttl: float = 86400.0  # Then serve stale while refreshing for a day
+    
+    # CourtListener opinion cache (on disk, shared by all workers)
+    opinion_cache_path: str = "var/opinion_cache.sqlite3"
+    opinion_cache_max_bytes: int = 512 * 1024 * 1024
+    opinion_cache_revalidate_after: float = 7 * 86400.0
+    
+    # Local case-law index built by scripts/build_case_index.py
+    case_index_path: str = "var/case_index.sqlite3"
+    case_search_backend: str = "auto"  # "auto" (local, then remote if no hits), "local" or "remote"
+    
+    # Hybrid retrieval (needs numpy; vectors built by scripts/build_case_vectors.py)
+    hybrid_search_enabled: bool = True
+    case_vectors_path: str = "var/case_vectors"  # Prefix for .f32 matrix, .ids.npy, .idf.npy and .json
+    embedding_backend: str = "auto"  # "auto" (model if installed), "model" or "hashing"
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_dim: int = 1024  # Hashed TF-IDF dimensions
+    hybrid_search_depth: int = 50  # Candidates taken from each retriever before fusion
+    hybrid_rrf_k: int = 60
+    # Cosine below which a dense hit is noise; the scales differ per embedder. Hashed
+    # vectors of unrelated text score under ~0.08, MiniLM pairs under ~0.25
+    hybrid_min_similarity_hashing: float = 0.1
+    hybrid_min_similarity_model: float = 0.3
+    
+    # Procedural knowledge base (markdown shared with the MCP server)
+    knowledge_base_dir: str = "mcp/courtlistener-mcp/data/kb"
+    knowledge_base_check_interval: float = 2.0  # Seconds between checks for edited files
+    
+    # Demand notice rendering
+    jinja_bytecode_cache_dir: str = "var/jinja_cache"
+    rendered_notice_cache_ttl: float = 3600.0
+    rendered_notice_cache_max_entries: int = 256
+    
+    # PDF rendering process pool
+    pdf_workers: int = 2
+    pdf_max_queue: int = 8  # Renders allowed to wait for a worker before returning 503
+    pdf_retry_after: int = 5  # Seconds, sent as Retry-After when the pool is saturated
+    pdf_cache_dir: str = "var/pdf_cache"
+    pdf_cache_max_bytes: int = 256 * 1024 * 1024
+    
+    # Demand notice background jobs
+    notice_job_store_path: str = "var/notice_jobs.sqlite3"
+    notice_job_workers: int = 4
+    notice_job_max_pending_per_user: int = 10
+    notice_job_timeout: float = 60.0  # Whole pipeline: history, case search and PDF render
+    notice_job_retention: int = 7 * 24 * 3600  # Finished jobs are purged after this many seconds
+    notice_job_lease: float = 180.0  # Seconds a claim lasts; must exceed notice_job_timeout plus the callback
+    notice_job_sweep_interval: float = 30.0  # How often to look for other processes' queued or abandoned jobs
+    notice_job_max_retries: int = 10  # Backoff retries while the PDF pool is saturated
+    
+    # Bulk demand notices
+    bulk_notice_max_requests: int = 200
+    
     # Server
     host: str = "0.0.0.0"
     port: int = 8000
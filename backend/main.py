@@ -1,15 +1,43 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from backend.api.routes import chat, cases, demand_notice, auth, payment
+from backend.api.routes import chat, cases, demand_notice, auth, payment, knowledge
 from backend.config.settings import settings
+from backend.services.http_clients import http_clients
+from backend.services.honcho_service import get_memory_service, close_memory_service
+from backend.services.pdf_renderer import pdf_render_pool
+from backend.services.notice_jobs import get_notice_job_queue
+from backend.services.knowledge_base import get_knowledge_base
+from backend.services.hybrid_search import get_case_retriever
 import uvicorn
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared upstream connection pools and the memory service for the life of the app"""
+    await http_clients.startup()
+    app.state.http_clients = http_clients
+    app.state.memory_service = get_memory_service()
+    pdf_render_pool.start()
+    get_knowledge_base()
+    # Loads the embedding model, if any, before the first search needs it
+    await asyncio.to_thread(get_case_retriever)
+    await get_notice_job_queue().start()
+    try:
+        yield
+    finally:
+        await get_notice_job_queue().close()
+        await close_memory_service()
+        await http_clients.close()
+        pdf_render_pool.shutdown()
+
 # Create FastAPI app
 app = FastAPI(
     title="NYC Legal Assistant AI",
     description="AI-powered legal assistant with authentication and payment processing",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -27,6 +55,7 @@ app.include_router(payment.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
 app.include_router(cases.router, prefix="/api")
 app.include_router(demand_notice.router, prefix="/api")
+app.include_router(knowledge.router, prefix="/api")
 
 @app.get("/api/health")
 async def health_check():
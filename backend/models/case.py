@@ -3,7 +3,8 @@ from typing import List, Optional
 from datetime import date
 
 class LegalCase(BaseModel):
-    id: str
+    id: str  # Opinion id, as taken by /api/cases/{case_id}
+    cluster_id: Optional[str] = None
     case_name: str
     court: str
     date_filed: Optional[date]
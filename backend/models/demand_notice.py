@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, HttpUrl
 from typing import Optional, List
 
 class DemandNoticeRequest(BaseModel):
@@ -32,4 +32,16 @@ class DemandNoticeResponse(BaseModel):
 class DemandNoticePDFResponse(BaseModel):
     pdf_content: bytes
     filename: str
-    content_type: str = "application/pdf"
\ No newline at end of file
+    content_type: str = "application/pdf"
+class DemandNoticeJobRequest(DemandNoticeRequest):
+    # Called with the job status once it finishes
+    callback_url: Optional[HttpUrl] = None
+
+class DemandNoticeJob(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    updated_at: float
+    result: Optional[DemandNoticeResponse] = None
+    error: Optional[str] = None
+    pdf_url: Optional[str] = None
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class KnowledgeHit(BaseModel):
+    heading: str
+    source: Optional[str]
+    text: str
+    file: str
+    score: float
@@ -1,15 +1,42 @@
 import httpx
-from typing import List, Optional, Dict
+import json
+from typing import List, Optional, Dict, AsyncIterator
 from backend.config.settings import settings
 from backend.models.chat import ChatMessage
 from backend.models.case import LegalCase
 
-class AIService:
+DEMAND_NOTICE_KEYWORDS = [
+    "demand notice", "demand letter", "formal demand", 
+    "written notice", "legal notice", "demand for payment"
+]
+
+
+class DemandNoticeDetector:
+    """Incrementally detect demand-notice keywords as response text arrives"""
+    
     def __init__(self):
+        self.detected = False
+        # Keep just enough trailing text to catch a keyword split across chunks
+        self._overlap = max(len(keyword) for keyword in DEMAND_NOTICE_KEYWORDS) - 1
+        self._tail = ""
+    
+    def feed(self, text: str) -> bool:
+        """Feed the next chunk of text; returns True once any keyword has been seen"""
+        if not self.detected:
+            window = self._tail + text.lower()
+            self.detected = any(keyword in window for keyword in DEMAND_NOTICE_KEYWORDS)
+            self._tail = window[-self._overlap:]
+        return self.detected
+
+
+class AIService:
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.api_key = settings.openrouter_api_key
         self.base_url = settings.openrouter_base_url
         self.model = settings.ai_model
-        self.client = httpx.AsyncClient()
+        # Shared pooled client from the app lifespan; only close it if we created it
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient()
     
     def _create_system_prompt(self, cases: List[LegalCase]) -> str:
         """Create system prompt with relevant NYC/NY state case law"""
@@ -43,14 +70,13 @@ FOCUS: Consumer Protection Law, NYC Consumer Protection Law (Subchapter 2 of Cha
 
 Remember: Always remind users to consult with a qualified New York attorney for official legal advice."""
 
-    async def generate_response(
+    def _build_messages(
         self, 
         user_message: str, 
         chat_history: List[ChatMessage], 
         relevant_cases: List[LegalCase]
-    ) -> Dict:
-        """Generate AI response with NY case law context"""
-        
+    ) -> List[Dict]:
+        """Build the OpenRouter message list with NY case law context"""
         messages = [
             {"role": "system", "content": self._create_system_prompt(relevant_cases)}
         ]
@@ -60,17 +86,27 @@ Remember: Always remind users to consult with a qualified New York attorney for
             messages.append({"role": msg.role, "content": msg.content})
         
         messages.append({"role": "user", "content": user_message})
-        
-        headers = {
+        return messages
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "HTTP-Referer": "http://localhost:8000",
             "X-Title": "NYC Legal Assistant AI"
         }
+    
+    async def generate_response(
+        self, 
+        user_message: str, 
+        chat_history: List[ChatMessage], 
+        relevant_cases: List[LegalCase]
+    ) -> Dict:
+        """Generate AI response with NY case law context"""
         
         data = {
             "model": self.model,
-            "messages": messages,
+            "messages": self._build_messages(user_message, chat_history, relevant_cases),
             "temperature": 0.3,
             "max_tokens": 1200
         }
@@ -79,7 +115,7 @@ Remember: Always remind users to consult with a qualified New York attorney for
             response = await self.client.post(
                 f"{self.base_url}/chat/completions",
                 json=data,
-                headers=headers,
+                headers=self._headers(),
                 timeout=30.0
             )
             response.raise_for_status()
@@ -88,11 +124,7 @@ Remember: Always remind users to consult with a qualified New York attorney for
             ai_response = result["choices"][0]["message"]["content"]
             
             # Check if response suggests demand notice
-            demand_notice_keywords = [
-                "demand notice", "demand letter", "formal demand", 
-                "written notice", "legal notice", "demand for payment"
-            ]
-            can_generate_demand = any(keyword in ai_response.lower() for keyword in demand_notice_keywords)
+            can_generate_demand = DemandNoticeDetector().feed(ai_response)
             
             return {
                 "response": ai_response,
@@ -107,5 +139,49 @@ Remember: Always remind users to consult with a qualified New York attorney for
                 "can_generate_demand_notice": False
             }
     
+    async def stream_response(
+        self, 
+        user_message: str, 
+        chat_history: List[ChatMessage], 
+        relevant_cases: List[LegalCase]
+    ) -> AsyncIterator[str]:
+        """Stream response text deltas from OpenRouter as they are generated"""
+        
+        data = {
+            "model": self.model,
+            "messages": self._build_messages(user_message, chat_history, relevant_cases),
+            "temperature": 0.3,
+            "max_tokens": 1200,
+            "stream": True
+        }
+        
+        # The read timeout applies between chunks, not to the whole generation
+        async with self.client.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            json=data,
+            headers=self._headers(),
+            timeout=httpx.Timeout(30.0, read=60.0)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                # OpenRouter sends ": OPENROUTER PROCESSING" keep-alive comments
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except json.JSONDecodeError:
+                    continue
+                if "error" in chunk:
+                    raise httpx.HTTPError(f"OpenRouter stream error: {chunk['error']}")
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    
     async def close(self):
-        await self.client.aclose()
\ No newline at end of file
+        if self._owns_client:
+            await self.client.aclose()
\ No newline at end of file
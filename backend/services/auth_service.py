@@ -1,7 +1,41 @@
 from supabase import create_client, Client
 from backend.config.settings import settings
-from typing import Optional, Dict, Any
+from backend.services.cache import TTLCache
+from backend.services.http_clients import http_clients, SUPABASE
+from typing import Optional, Dict, Any, List
+import asyncio
+import hashlib
 import json
+import time
+import jwt
+
+# Verified claims keyed by token hash, so raw tokens are never held in memory
+token_cache = TTLCache(
+    max_entries=settings.auth_cache_max_entries,
+    ttl=settings.auth_cache_ttl
+)
+
+
+# Profiles keyed by user id; create_user_profile replaces the entry it writes
+profile_cache = TTLCache(
+    max_entries=settings.profile_cache_max_entries,
+    ttl=settings.profile_cache_ttl
+)
+
+
+class TokenRejected(Exception):
+    """Token failed local verification (bad signature, expired, wrong audience)"""
+
+
+def _unverified_expiry(token: str) -> Optional[float]:
+    """The token's exp claim without checking the signature, used only to bound caching"""
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False, "verify_exp": False})
+    except jwt.InvalidTokenError:
+        return None
+    exp = claims.get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
+
 
 class AuthService:
     def __init__(self):
@@ -9,12 +43,90 @@ class AuthService:
             settings.supabase_url,
             settings.supabase_service_role_key
         )
+        # Asymmetric Supabase signing keys are published as a JWKS; PyJWKClient caches them
+        self.jwks_client = jwt.PyJWKClient(
+            f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json",
+            cache_keys=True,
+            lifespan=settings.auth_jwks_cache_ttl
+        )
     
     async def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify JWT token and return user data"""
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        cached = token_cache.get(token_hash)
+        if cached is not None:
+            user_data, expires_at = cached[0]
+            if expires_at > time.time():
+                return user_data
+            token_cache.invalidate(token_hash)
+        
+        try:
+            claims = await self._decode_locally(token)
+        except TokenRejected as e:
+            print(f"Error verifying token: {e}")
+            return None
+        
+        if claims is not None and not settings.auth_check_revocation:
+            user_data = {
+                "user_id": claims["sub"],
+                "email": claims.get("email"),
+                "user_metadata": claims.get("user_metadata", {})
+            }
+        else:
+            # No usable key locally, or revocation must be checked against Supabase
+            user_data = await self._verify_remotely(token)
+            if not user_data:
+                return None
+        
+        now = time.time()
+        ttl = settings.auth_revocation_cache_ttl if settings.auth_check_revocation else settings.auth_cache_ttl
+        expires_at = now + ttl
+        # Never cache past the token's own expiry, whichever way it was verified
+        token_exp = claims["exp"] if claims and "exp" in claims else _unverified_expiry(token)
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        if expires_at <= now:
+            return user_data
+        token_cache.set(token_hash, (user_data, expires_at))
+        return user_data
+    
+    async def _decode_locally(self, token: str) -> Optional[Dict[str, Any]]:
+        """Check signature, expiry and audience without a network call.
+        
+        Returns None when no local key is available for the token's algorithm;
+        raises TokenRejected when the token is definitely invalid.
+        """
+        try:
+            algorithm = jwt.get_unverified_header(token).get("alg")
+            if algorithm == "HS256":
+                if not settings.supabase_jwt_secret:
+                    return None
+                key = settings.supabase_jwt_secret
+            elif algorithm in ("RS256", "ES256"):
+                signing_key = await asyncio.to_thread(self.jwks_client.get_signing_key_from_jwt, token)
+                key = signing_key.key
+            else:
+                raise TokenRejected(f"Unsupported token algorithm: {algorithm}")
+            
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=settings.supabase_jwt_audience,
+                options={"require": ["exp", "sub"]}
+            )
+        except jwt.PyJWKClientError as e:
+            # JWKS unreachable or key not published: let Supabase decide
+            print(f"JWKS lookup failed, verifying remotely: {e}")
+            return None
+        except jwt.InvalidTokenError as e:
+            raise TokenRejected(str(e))
+    
+    async def _verify_remotely(self, token: str) -> Optional[Dict[str, Any]]:
+        """Ask Supabase Auth about the token (also catches revoked sessions)"""
         try:
-            # Verify the JWT token
-            response = self.supabase.auth.get_user(token)
+            # Verify the JWT token; the supabase client is synchronous
+            response = await asyncio.to_thread(self.supabase.auth.get_user, token)
             
             if response.user:
                 return {
@@ -27,23 +139,73 @@ class AuthService:
             print(f"Error verifying token: {e}")
             return None
     
+    def _rest_headers(self) -> Dict[str, str]:
+        return {
+            "apikey": settings.supabase_service_role_key,
+            "Authorization": f"Bearer {settings.supabase_service_role_key}",
+            "Content-Type": "application/json"
+        }
+    
+    async def _fetch_profiles(self, user_ids: List[str]) -> List[Dict[str, Any]]:
+        """Query the profiles table over the pooled async client with one `in` filter"""
+        # PostgREST list syntax; ids are quoted so commas or parens can't break the filter
+        id_list = ",".join(f'"{user_id}"' for user_id in user_ids)
+        response = await http_clients.get(SUPABASE).get(
+            f"{settings.supabase_url.rstrip('/')}/rest/v1/profiles",
+            params={"select": "*", "id": f"in.({id_list})"},
+            headers=self._rest_headers()
+        )
+        response.raise_for_status()
+        return response.json()
+    
     async def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile from Supabase"""
+        profiles = await self.get_user_profiles([user_id])
+        return profiles.get(user_id)
+    
+    async def get_user_profiles(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many user profiles, reading through the cache with a single query for misses"""
+        profiles = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = profile_cache.get(user_id)
+            if cached is not None:
+                profiles[user_id] = cached[0]
+            else:
+                missing.append(user_id)
+        
+        if not missing:
+            return profiles
+        
         try:
-            response = self.supabase.table('profiles').select('*').eq('id', user_id).execute()
-            
-            if response.data:
-                return response.data[0]
-            return None
+            for profile in await self._fetch_profiles(missing):
+                profile_id = str(profile.get("id"))
+                profile_cache.set(profile_id, profile)
+                profiles[profile_id] = profile
         except Exception as e:
             print(f"Error getting user profile: {e}")
-            return None
+        
+        return profiles
     
     async def create_user_profile(self, user_data: Dict[str, Any]) -> bool:
         """Create user profile in Supabase"""
+        user_id = user_data.get("id")
+        if user_id:
+            profile_cache.invalidate(str(user_id))
+        
         try:
-            response = self.supabase.table('profiles').insert(user_data).execute()
-            return len(response.data) > 0
+            response = await http_clients.get(SUPABASE).post(
+                f"{settings.supabase_url.rstrip('/')}/rest/v1/profiles",
+                json=user_data,
+                headers={**self._rest_headers(), "Prefer": "return=representation"}
+            )
+            response.raise_for_status()
+            created = response.json()
+            
+            # Write-through: the row we just stored is the freshest copy
+            for profile in created:
+                profile_cache.set(str(profile.get("id")), profile)
+            return len(created) > 0
         except Exception as e:
             print(f"Error creating user profile: {e}")
             return False
@@ -61,8 +223,20 @@ class AuthService:
                 "metadata": json.dumps(payment_data.get("metadata", {}))
             }
             
-            response = self.supabase.table('payments').insert(payment_log).execute()
+            # supabase-py is synchronous; keep the insert off the event loop
+            response = await asyncio.to_thread(self.supabase.table('payments').insert(payment_log).execute)
             return len(response.data) > 0
         except Exception as e:
             print(f"Error logging payment: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+_auth_service: Optional[AuthService] = None
+
+
+def get_shared_auth_service() -> AuthService:
+    """Return the process-wide AuthService so the Supabase client is built once"""
+    global _auth_service
+    if _auth_service is None:
+        _auth_service = AuthService()
+    return _auth_service
@@ -0,0 +1,225 @@
+"""
+In-memory BM25 index over heading-aware chunks of markdown files.
+Standard library only, so the stdio MCP server can import it without the
+backend's settings or dependencies
+"""
+
+import glob
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*$")
+RULE_RE = re.compile(r"^\s*-{3,}\s*$")
+SOURCE_RE = re.compile(r"\[SRC:([^\]]+)\]")
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+TOPIC_ITEM_RE = re.compile(r"\n(?=- \*\*)")  # "- **Topic**" bullets open a new Q&A-style item
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it my of on or "
+    "so that the their them they this to was what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.replace(",", "")
+        if token in STOPWORDS:
+            continue
+        # Light plural folding so "claims" matches "claim" without a stemmer dependency
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss") and not token[-2].isdigit():
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class Chunk:
+    path: str
+    heading: str  # "File title > Section"
+    source: Optional[str]  # [SRC:...] tag from the nearest heading, for citations
+    text: str
+
+
+@dataclass
+class SearchHit:
+    chunk: Chunk
+    score: float
+
+
+def _topic_parts(content: str, max_chars: int) -> List[str]:
+    # Lists of bolded items (FAQs, fee tiers, court addresses) are one topic per item
+    items = [item.strip() for item in TOPIC_ITEM_RE.split(content) if item.strip()]
+    if len(items) >= 3:
+        return items
+    if len(content) <= max_chars:
+        return [content]
+    # Otherwise split oversized sections at blank lines so one chunk stays one topic
+    parts = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", content):
+        if current and len(current) + len(paragraph) > max_chars:
+            parts.append(current.strip())
+            current = ""
+        current += paragraph + "\n\n"
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def chunk_markdown(path: str, text: str, max_chars: int = 1200) -> List[Chunk]:
+    """Split a markdown file at headings, keeping the heading trail on each chunk"""
+    chunks: List[Chunk] = []
+    trail: List[Tuple[int, str]] = []
+    source: Optional[str] = None
+    body: List[str] = []
+
+    def flush():
+        content = "\n".join(line for line in body if not RULE_RE.match(line)).strip()
+        body.clear()
+        if not content:
+            return
+        heading = " > ".join(SOURCE_RE.sub("", title).strip() for _, title in trail)
+        for part in _topic_parts(content, max_chars):
+            chunks.append(Chunk(path, heading, source, part))
+
+    for line in text.splitlines():
+        match = HEADING_RE.match(line)
+        if not match:
+            body.append(line)
+            continue
+        flush()
+        level, title = len(match.group(1)), match.group(2)
+        trail = [(lvl, t) for lvl, t in trail if lvl < level] + [(level, title)]
+        tag = SOURCE_RE.search(title)
+        if tag:
+            source = tag.group(1)
+        elif level == 1:
+            source = None
+    flush()
+    return chunks
+
+
+class BM25Index:
+    """BM25 over markdown chunks; postings are parallel arrays per term"""
+
+    def __init__(self, directory: str, pattern: str = "*.md", k1: float = 1.2, b: float = 0.75,
+                 check_interval: float = 2.0):
+        self.directory = directory
+        self.pattern = pattern
+        self.k1 = k1
+        self.b = b
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        # path -> ((mtime, size), [(chunk, term counts)]); unchanged files are never re-tokenized
+        self._files: Dict[str, Tuple[Tuple[float, int], List[Tuple[Chunk, Counter]]]] = {}
+        # (chunks, term ids, doc ids per term, term freqs per term, idf, chunk lengths, average length)
+        self._index: Tuple = ([], {}, [], [], array("d"), array("I"), 0.0)
+        self.builds = 0
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-read changed files and rebuild postings; True if anything changed"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        with self._lock:
+            self._last_check = now
+            changed = False
+            seen = set()
+            for path in sorted(glob.glob(os.path.join(self.directory, self.pattern))):
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                signature = (stat.st_mtime, stat.st_size)
+                cached = self._files.get(path)
+                if cached and cached[0] == signature:
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+                # Only the innermost heading is indexed; the file title is on every chunk and
+                # would just dilute the section names
+                self._files[path] = (signature, [
+                    (chunk, Counter(tokenize(f"{chunk.heading.rsplit(' > ', 1)[-1]}\n{chunk.text}")))
+                    for chunk in chunk_markdown(path, text)
+                ])
+                changed = True
+            for path in set(self._files) - seen:
+                del self._files[path]
+                changed = True
+            if changed or force:
+                self._build()
+            return changed
+
+    def _build(self):
+        chunks: List[Chunk] = []
+        lengths = array("I")
+        postings: Dict[str, Tuple[array, array]] = {}
+        for _, entries in self._files.values():
+            for chunk, counts in entries:
+                doc_id = len(chunks)
+                chunks.append(chunk)
+                lengths.append(sum(counts.values()))
+                for term, count in counts.items():
+                    doc_ids, freqs = postings.setdefault(term, (array("I"), array("H")))
+                    doc_ids.append(doc_id)
+                    freqs.append(min(count, 65535))
+
+        total = len(chunks)
+        terms: Dict[str, int] = {}
+        doc_id_lists: List[array] = []
+        freq_lists: List[array] = []
+        idf = array("d")
+        for term, (doc_ids, freqs) in postings.items():
+            terms[term] = len(doc_id_lists)
+            doc_id_lists.append(doc_ids)
+            freq_lists.append(freqs)
+            df = len(doc_ids)
+            idf.append(max(0.0, math.log(1 + (total - df + 0.5) / (df + 0.5))))
+
+        # Swap everything at once so concurrent searches see a consistent index
+        self._index = (chunks, terms, doc_id_lists, freq_lists, idf, lengths, (sum(lengths) / total) if total else 0.0)
+        self.builds += 1
+
+    @property
+    def chunks(self) -> List[Chunk]:
+        return self._index[0]
+
+    def search(self, query: str, limit: int = 5) -> List[SearchHit]:
+        self.refresh()
+        chunks, terms, doc_ids, freqs, idf, lengths, avg_length = self._index
+        if not chunks:
+            return []
+        k1, b = self.k1, self.b
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            term_id = terms.get(term)
+            if term_id is None:
+                continue
+            weight = idf[term_id]
+            for doc_id, tf in zip(doc_ids[term_id], freqs[term_id]):
+                norm = k1 * (1 - b + b * lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf * (k1 + 1) / (tf + norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [SearchHit(chunks[doc_id], score) for doc_id, score in best]
+
+    def stats(self) -> dict:
+        chunks, terms, doc_ids = self._index[:3]
+        return {
+            "files": len(self._files),
+            "chunks": len(chunks),
+            "terms": len(terms),
+            "postings": sum(len(ids) for ids in doc_ids),
+            "builds": self.builds,
+        }
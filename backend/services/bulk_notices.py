@@ -0,0 +1,159 @@
+"""
+Bulk demand-notice generation.
+Requests that share a respondent and issue share one case search, PDFs render
+in parallel on the process pool, and the ZIP is streamed as each file finishes
+"""
+
+import asyncio
+import csv
+import io
+import re
+import zipfile
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from backend.config.settings import settings
+from backend.models.demand_notice import DemandNoticeRequest
+from backend.services.court_listener import CourtListenerService
+from backend.services.demand_notice_generator import get_demand_notice_generator
+from backend.services.notice_jobs import search_case_references
+from backend.services.pdf_cache import get_pdf_cache, content_key
+from backend.services.pdf_renderer import pdf_render_pool, PDFPoolSaturated
+
+# Shared by every bulk request, so concurrent uploads together leave pool capacity for
+# interactive downloads instead of each filling the wait queue
+bulk_render_slots = asyncio.Semaphore(max(1, pdf_render_pool.workers))
+RENDER_ATTEMPTS = 5
+
+
+class BulkRequestError(ValueError):
+    """A bulk upload that can't be turned into notice requests"""
+
+
+def parse_csv(data: bytes, defaults: Dict[str, str]) -> List[DemandNoticeRequest]:
+    """One DemandNoticeRequest per CSV row; columns use the request's field names"""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise BulkRequestError("CSV must be UTF-8 encoded")
+
+    requests = []
+    for line_number, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+        # Blank cells fall back to the defaults or the model's own defaults
+        fields = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        try:
+            requests.append(DemandNoticeRequest(**{**defaults, **fields}))
+        except ValidationError as e:
+            missing = ", ".join(str(error["loc"][0]) for error in e.errors())
+            raise BulkRequestError(f"Row {line_number}: invalid or missing {missing}")
+    return requests
+
+
+def _group_key(request: DemandNoticeRequest) -> Tuple[str, str]:
+    return (
+        " ".join(request.respondent_name.lower().split()),
+        " ".join(request.issue_description.lower().split())
+    )
+
+
+def _archive_name(index: int, request: DemandNoticeRequest) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", request.complainant_name.lower()).strip("_") or "complainant"
+    return f"{index + 1:03d}_{slug}.pdf"
+
+
+class _ZipChunks(io.RawIOBase):
+    """Write-only sink for ZipFile; the streaming response drains it after each file"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _render_cached(notice_content: str) -> bytes:
+    key = content_key(notice_content)
+    cache = get_pdf_cache()
+    path = await asyncio.to_thread(cache.get, key)
+    if path is not None:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+    for attempt in range(RENDER_ATTEMPTS):
+        try:
+            async with bulk_render_slots:
+                pdf = await pdf_render_pool.render(notice_content)
+            break
+        except PDFPoolSaturated:
+            # Interactive renders filled the pool; it drains quickly, so back off and retry
+            if attempt == RENDER_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(min(settings.pdf_retry_after * 2 ** attempt, 60))
+    await asyncio.to_thread(cache.put, key, pdf)
+    return pdf
+
+
+async def stream_notice_zip(
+    requests: List[DemandNoticeRequest], court_service: CourtListenerService
+) -> AsyncIterator[bytes]:
+    """Yield a ZIP of one PDF per request plus manifest.csv, in completion order"""
+    searches: Dict[Tuple[str, str], asyncio.Task] = {}
+    for request in requests:
+        key = _group_key(request)
+        if key not in searches:
+            searches[key] = asyncio.create_task(
+                search_case_references(court_service, request.issue_description)
+            )
+
+    generator = get_demand_notice_generator()
+
+    async def build(index: int, request: DemandNoticeRequest) -> Tuple[int, Optional[bytes], Optional[str]]:
+        try:
+            case_references = await searches[_group_key(request)]
+            notice_content = generator.generate_notice(request, case_references)
+            return index, await _render_cached(notice_content), None
+        except Exception as e:
+            # Some exceptions carry no message; the manifest should still say what went wrong
+            return index, None, str(e) or type(e).__name__
+
+    tasks = [asyncio.create_task(build(index, request)) for index, request in enumerate(requests)]
+    sink = _ZipChunks()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(["row", "complainant_name", "respondent_name", "file", "error"])
+    try:
+        # PDFs are already compressed, so entries are stored as-is
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            for finished in asyncio.as_completed(tasks):
+                index, pdf, error = await finished
+                request = requests[index]
+                name = _archive_name(index, request) if pdf is not None else ""
+                if pdf is not None:
+                    archive.writestr(name, pdf)
+                writer.writerow([index + 1, request.complainant_name, request.respondent_name, name, error or ""])
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            archive.writestr("manifest.csv", manifest.getvalue())
+        yield sink.drain()
+    finally:
+        # Client went away mid-stream: stop outstanding work
+        for task in tasks + list(searches.values()):
+            task.cancel()
+
+
+def check_bulk_size(requests: List[DemandNoticeRequest]):
+    if not requests:
+        raise BulkRequestError("No demand notices in request")
+    if len(requests) > settings.bulk_notice_max_requests:
+        raise BulkRequestError(f"At most {settings.bulk_notice_max_requests} demand notices per request")
@@ -0,0 +1,121 @@
+"""
+In-process caches and request coalescing shared by service instances
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """LRU cache whose entries expire after a TTL but can still be served stale.
+
+    `get` returns `(value, fresh)` so callers can serve an expired entry
+    immediately and refresh it in the background (stale-while-revalidate).
+    Entries older than `ttl + stale_ttl` are treated as misses.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, stale_ttl: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, value = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if age > self.ttl:
+            self.stale_hits += 1
+            return value, False
+        self.hits += 1
+        return value, True
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0
+        }
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one shared upstream call.
+
+    The first caller for a key starts the call as a task; callers arriving while
+    it is in flight await the same task. The task is shielded so a disconnecting
+    caller doesn't cancel the result the others are waiting on.
+    """
+
+    def __init__(self, name: str, history: int = 100):
+        self.name = name
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self._callers: Dict[Hashable, int] = {}
+        self.recent = deque(maxlen=history)  # (key, callers served) per finished flight
+        self.flights = 0
+        self.callers = 0
+        self.max_callers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            self._callers[key] = 0
+            task.add_done_callback(lambda _: self._finish(key))
+        self._callers[key] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable):
+        self._flights.pop(key, None)
+        served = self._callers.pop(key, 0)
+        self.flights += 1
+        self.callers += served
+        self.max_callers = max(self.max_callers, served)
+        self.recent.append((key, served))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "flights": self.flights,
+            "callers": self.callers,
+            "coalesced": self.callers - self.flights,
+            "max_callers": self.max_callers,
+            "recent": [{"key": str(key), "callers": served} for key, served in list(self.recent)[-10:]]
+        }
@@ -0,0 +1,387 @@
+"""
+Local NY case-law index built from CourtListener bulk data.
+Dockets, clusters and opinions for the NY courts are loaded into SQLite FTS5
+so case searches are answered offline, with the remote API as fallback
+"""
+
+import bz2
+import csv
+import gzip
+import html
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from backend.config.settings import settings
+from backend.models.case import LegalCase
+from backend.services.case_search import search_cases
+
+# NY_COURTS from court_listener.py plus the NY trial and appellate courts the
+# MCP server searches (NY_PRIMARY_COURTS + NY_SECONDARY_COURTS)
+INDEX_COURTS = [
+    "ny", "nyappdiv", "nysupct", "ca2", "nyed", "nynd", "nysd", "nywd",
+    "ny-civ-ct", "ny-city-ct-buffalo", "ny-city-ct-rochester", "ny-city-ct-syracuse",
+    "ny-city-ct-albany", "ny-city-ct-yonkers", "ny-dist-ct-nassau", "ny-dist-ct-suffolk",
+    "ny-supreme-ct", "ny-app-div-1st", "ny-app-div-2nd", "ny-app-div-3rd",
+    "ny-app-div-4th", "ny-ct-app",
+]
+
+DOCKETS = "dockets"
+CLUSTERS = "clusters"
+OPINIONS = "opinions"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dockets (
+    id INTEGER PRIMARY KEY,
+    court_id TEXT NOT NULL,
+    case_name TEXT,
+    docket_number TEXT,
+    date_filed TEXT,
+    date_modified TEXT
+);
+CREATE TABLE IF NOT EXISTS clusters (
+    id INTEGER PRIMARY KEY,
+    docket_id INTEGER NOT NULL,
+    court_id TEXT NOT NULL,
+    case_name TEXT,
+    date_filed TEXT,
+    slug TEXT,
+    precedential_status TEXT,
+    citation_count INTEGER,
+    date_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_clusters_docket_id ON clusters(docket_id);
+CREATE TABLE IF NOT EXISTS opinions (
+    id INTEGER PRIMARY KEY,
+    cluster_id INTEGER NOT NULL,
+    type TEXT,
+    date_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_opinions_cluster_id ON opinions(cluster_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS opinion_fts USING fts5(
+    case_name, text, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    kind TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+"""
+
+# Text fields in the order CourtListener recommends using them
+TEXT_FIELDS = ("plain_text", "html_with_citations", "html", "html_lawbox", "html_columbia", "xml_harvard")
+# CourtListener's CSV dumps are PostgreSQL COPY exports quoted with backticks and
+# backslash-escaped (see their bulk-data docs); "standard" reads RFC 4180 files
+CSV_FORMATS = {
+    "courtlistener": {"quotechar": "`", "escapechar": "\\"},
+    "standard": {},
+}
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+def detect_kind(path: str) -> Optional[str]:
+    """Dump type from a bulk file name, e.g. opinion-clusters-2024-05-06.csv.bz2"""
+    name = os.path.basename(path).lower()
+    if "cluster" in name:
+        return CLUSTERS
+    if "docket" in name:
+        return DOCKETS
+    if "opinion" in name:
+        return OPINIONS
+    return None
+
+
+def _open_text(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def read_records(path: str, csv_format: str = "courtlistener") -> Iterator[Dict[str, Any]]:
+    """Stream rows from a CSV, JSON or JSON-lines dump, optionally bz2/gzip compressed"""
+    name = path.lower()
+    for suffix in (".bz2", ".gz"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+
+    with _open_text(path) as f:
+        if name.endswith(".csv"):
+            # Opinion text columns are far larger than csv's default field limit
+            csv.field_size_limit(sys.maxsize)
+            yield from csv.DictReader(f, **CSV_FORMATS[csv_format])
+        elif name.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif name.endswith(".json"):
+            data = json.load(f)
+            if isinstance(data, dict):
+                data = data.get("results", [data])
+            yield from data
+        else:
+            raise ValueError(f"Unsupported bulk file type: {path}")
+
+
+def _ref(record: Dict[str, Any], id_field: str, url_field: str) -> Optional[str]:
+    """Foreign key from a v4-style *_id column or a v3-style resource URL"""
+    value = record.get(id_field)
+    if value in (None, ""):
+        value = record.get(url_field)
+        if isinstance(value, str) and "/" in value:
+            value = value.rstrip("/").rsplit("/", 1)[-1]
+    return str(value) if value not in (None, "") else None
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def opinion_text(record: Dict[str, Any]) -> str:
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        if value:
+            if field == "plain_text":
+                return value
+            return html.unescape(TAG_RE.sub(" ", value))
+    return ""
+
+
+class CaseIndex:
+    """SQLite FTS5 index of NY opinions with their cluster and docket metadata"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; callers run us via asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def opinion_count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM opinions").fetchone()[0]
+
+    # Ingestion
+
+    def ingest_file(
+        self, path: str, kind: Optional[str] = None, courts: Iterable[str] = INDEX_COURTS,
+        force: bool = False, batch_size: int = 5000, csv_format: str = "courtlistener"
+    ) -> int:
+        """Upsert one bulk file; unchanged files already ingested are skipped unless forced"""
+        kind = kind or detect_kind(path)
+        if kind not in (DOCKETS, CLUSTERS, OPINIONS):
+            raise ValueError(f"Can't tell whether {path} holds dockets, clusters or opinions")
+
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        conn = self._connect()
+        seen = conn.execute("SELECT size, mtime FROM ingested_files WHERE path = ?", (path,)).fetchone()
+        if seen == (stat.st_size, stat.st_mtime) and not force:
+            return 0
+
+        upsert = {DOCKETS: self._upsert_docket, CLUSTERS: self._upsert_cluster, OPINIONS: self._upsert_opinion}[kind]
+        parents = self._parent_ids(kind, set(courts))
+        rows = 0
+        pending = 0
+        conn.execute("BEGIN")
+        try:
+            for record in read_records(path, csv_format):
+                if upsert(conn, record, parents):
+                    rows += 1
+                    pending += 1
+                if pending >= batch_size:
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+                    pending = 0
+            conn.execute(
+                """INSERT INTO ingested_files (path, size, mtime, kind, rows, ingested_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,
+                       kind = excluded.kind, rows = excluded.rows, ingested_at = excluded.ingested_at""",
+                (path, stat.st_size, stat.st_mtime, kind, rows, time.time())
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _parent_ids(self, kind: str, courts: Set[str]):
+        # Dumps cover every court; keep a row only if its parent is already indexed
+        conn = self._connect()
+        if kind == DOCKETS:
+            return courts
+        if kind == CLUSTERS:
+            return {
+                docket_id: court_id
+                for docket_id, court_id in conn.execute("SELECT id, court_id FROM dockets")
+                if court_id in courts
+            }
+        return {
+            cluster_id: case_name
+            for cluster_id, court_id, case_name in conn.execute("SELECT id, court_id, case_name FROM clusters")
+            if court_id in courts
+        }
+
+    @staticmethod
+    def _is_newer(conn: sqlite3.Connection, table: str, row_id: int, date_modified: str) -> bool:
+        row = conn.execute(f"SELECT date_modified FROM {table} WHERE id = ?", (row_id,)).fetchone()
+        return row is None or not row[0] or not date_modified or date_modified >= row[0]
+
+    def _upsert_docket(self, conn: sqlite3.Connection, record: Dict[str, Any], courts: Set[str]) -> bool:
+        docket_id = _int(record.get("id"))
+        court_id = _ref(record, "court_id", "court")
+        date_modified = record.get("date_modified") or ""
+        if docket_id is None or court_id not in courts or not self._is_newer(conn, "dockets", docket_id, date_modified):
+            return False
+        conn.execute(
+            """INSERT OR REPLACE INTO dockets (id, court_id, case_name, docket_number, date_filed, date_modified)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (docket_id, court_id, record.get("case_name"), record.get("docket_number"),
+             record.get("date_filed") or None, date_modified)
+        )
+        return True
+
+    def _upsert_cluster(self, conn: sqlite3.Connection, record: Dict[str, Any], dockets: Dict[int, str]) -> bool:
+        cluster_id = _int(record.get("id"))
+        docket_id = _int(_ref(record, "docket_id", "docket"))
+        date_modified = record.get("date_modified") or ""
+        if cluster_id is None or docket_id not in dockets or not self._is_newer(conn, "clusters", cluster_id, date_modified):
+            return False
+        case_name = record.get("case_name") or record.get("case_name_full") or ""
+        conn.execute(
+            """INSERT OR REPLACE INTO clusters (id, docket_id, court_id, case_name, date_filed, slug,
+                   precedential_status, citation_count, date_modified)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (cluster_id, docket_id, dockets[docket_id], case_name, record.get("date_filed") or None,
+             record.get("slug"), record.get("precedential_status"), _int(record.get("citation_count")) or 0,
+             date_modified)
+        )
+        # Keep already-indexed opinion text searchable under a renamed case
+        conn.execute(
+            "UPDATE opinion_fts SET case_name = ? WHERE rowid IN (SELECT id FROM opinions WHERE cluster_id = ?)",
+            (case_name, cluster_id)
+        )
+        return True
+
+    def _upsert_opinion(self, conn: sqlite3.Connection, record: Dict[str, Any], clusters: Dict[int, str]) -> bool:
+        opinion_id = _int(record.get("id"))
+        cluster_id = _int(_ref(record, "cluster_id", "cluster"))
+        date_modified = record.get("date_modified") or ""
+        if opinion_id is None or cluster_id not in clusters or not self._is_newer(conn, "opinions", opinion_id, date_modified):
+            return False
+        conn.execute(
+            "INSERT OR REPLACE INTO opinions (id, cluster_id, type, date_modified) VALUES (?, ?, ?, ?)",
+            (opinion_id, cluster_id, record.get("type"), date_modified)
+        )
+        conn.execute("DELETE FROM opinion_fts WHERE rowid = ?", (opinion_id,))
+        conn.execute(
+            "INSERT INTO opinion_fts (rowid, case_name, text) VALUES (?, ?, ?)",
+            (opinion_id, clusters[cluster_id], opinion_text(record))
+        )
+        return True
+
+    def optimize(self):
+        """Merge FTS5 segments after a large ingest"""
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT INTO opinion_fts (opinion_fts) VALUES ('optimize')")
+
+    def iter_documents(self, max_chars: int = 20000) -> Iterator[Tuple[int, str]]:
+        """(cluster id, case name + opinion text) for every indexed case, for embedding"""
+        rows = self._connect().execute(
+            """SELECT c.id, c.case_name, group_concat(substr(f.text, 1, ?), ' ')
+               FROM clusters c
+               JOIN opinions o ON o.cluster_id = c.id
+               JOIN opinion_fts f ON f.rowid = o.id
+               GROUP BY c.id ORDER BY c.id""",
+            (max_chars,)
+        )
+        for cluster_id, case_name, text in rows:
+            yield cluster_id, f"{case_name or ''}\n{(text or '')[:max_chars]}"
+
+    def get_cases(self, cluster_ids: List[int]) -> Dict[int, LegalCase]:
+        """Metadata for cases found by another retriever, keyed by cluster id"""
+        if not cluster_ids:
+            return {}
+        rows = self._connect().execute(
+            f"""SELECT c.id, o.id, c.case_name, c.court_id, c.date_filed, c.slug, substr(f.text, 1, 240)
+                FROM clusters c
+                JOIN opinions o ON o.id = (SELECT MIN(id) FROM opinions WHERE cluster_id = c.id)
+                LEFT JOIN opinion_fts f ON f.rowid = o.id
+                WHERE c.id IN ({','.join('?' * len(cluster_ids))})""",
+            cluster_ids
+        )
+        return {
+            cluster_id: LegalCase(
+                id=str(opinion_id),
+                cluster_id=str(cluster_id),
+                case_name=case_name or "",
+                court=court_id,
+                date_filed=date_filed[:10] if date_filed else None,
+                snippet=" ".join((text or "").split()),
+                url=f"https://www.courtlistener.com/opinion/{cluster_id}/{slug or 'case'}/"
+            )
+            for cluster_id, opinion_id, case_name, court_id, date_filed, slug, text in rows
+        }
+
+    # Search
+
+    def search(
+        self, query: str, limit: int = 5, courts: Optional[Iterable[str]] = None,
+        filed_after: Optional[str] = None, filed_before: Optional[str] = None
+    ) -> List[LegalCase]:
+        """Best-matching cases, one result per cluster, ranked by bm25"""
+        hits = search_cases(self._connect(), query, limit, courts, filed_after, filed_before)
+        # The best-matching opinion stands for the case, so its id opens in /api/cases/{id}
+        return [
+            LegalCase(
+                id=str(hit.opinion_id),
+                cluster_id=str(hit.cluster_id),
+                case_name=hit.case_name,
+                court=hit.court_id,
+                date_filed=hit.date_filed[:10] if hit.date_filed else None,
+                snippet=hit.snippet,
+                url=f"https://www.courtlistener.com/opinion/{hit.cluster_id}/{hit.slug or 'case'}/",
+                # bm25() is lower-is-better; flip it so higher means more relevant like the API
+                relevance_score=-hit.score
+            )
+            for hit in hits
+        ]
+
+
+_case_index: Optional[CaseIndex] = None
+
+
+def get_case_index() -> Optional[CaseIndex]:
+    """The local index if it has been built and is enabled, else None"""
+    global _case_index
+    if settings.case_search_backend == "remote":
+        return None
+    if _case_index is None:
+        if not os.path.exists(settings.case_index_path):
+            return None
+        _case_index = CaseIndex(settings.case_index_path)
+    return _case_index
@@ -0,0 +1,84 @@
+"""
+Full-text search over the local case index built by case_index.py.
+Standard library only, so the stdio MCP server can query the index without the
+backend's settings or dependencies
+"""
+
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+MAX_QUERY_TERMS = 32
+
+
+@dataclass
+class CaseHit:
+    cluster_id: int
+    opinion_id: int  # Best-matching opinion, which stands for the case
+    docket_id: int
+    case_name: str
+    court_id: str
+    date_filed: Optional[str]
+    slug: Optional[str]
+    citation_count: int
+    score: float  # bm25(), lower is better
+    snippet: str
+
+
+def fts_query(query: str) -> str:
+    """Free text to an FTS5 expression: quoted terms OR'd together, ranked by bm25"""
+    terms = []
+    for term in TERM_RE.findall(query.lower()):
+        if term not in terms:
+            terms.append(term)
+    return " OR ".join(f'"{term}"' for term in terms[:MAX_QUERY_TERMS])
+
+
+def search_cases(
+    conn: sqlite3.Connection, query: str, limit: int = 5, courts: Optional[Iterable[str]] = None,
+    filed_after: Optional[str] = None, filed_before: Optional[str] = None
+) -> List[CaseHit]:
+    """Best-matching cases, one hit per cluster, ranked by bm25"""
+    expression = fts_query(query)
+    if not expression:
+        return []
+
+    sql = """
+        SELECT c.id, o.id, c.docket_id, c.case_name, c.court_id, c.date_filed, c.slug, c.citation_count,
+               bm25(opinion_fts) AS score, snippet(opinion_fts, 1, '<mark>', '</mark>', '…', 24)
+        FROM opinion_fts
+        JOIN opinions o ON o.id = opinion_fts.rowid
+        JOIN clusters c ON c.id = o.cluster_id
+        WHERE opinion_fts MATCH ?
+    """
+    params: List[Any] = [expression]
+    if courts:
+        courts = list(courts)
+        sql += f" AND c.court_id IN ({','.join('?' * len(courts))})"
+        params.extend(courts)
+    if filed_after:
+        sql += " AND c.date_filed >= ?"
+        params.append(filed_after)
+    if filed_before:
+        sql += " AND c.date_filed <= ?"
+        params.append(filed_before)
+    # A cluster can have several matching opinions; over-fetch, then keep each case once
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit * 4)
+
+    hits = []
+    seen = set()
+    for row in conn.execute(sql, params):
+        hit = CaseHit(*row)
+        if hit.cluster_id in seen:
+            continue
+        seen.add(hit.cluster_id)
+        hit.case_name = hit.case_name or ""
+        hit.citation_count = hit.citation_count or 0
+        hit.snippet = hit.snippet or ""
+        hits.append(hit)
+        if len(hits) >= limit:
+            break
+    return hits
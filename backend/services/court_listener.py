@@ -1,88 +1,216 @@
+import asyncio
 import httpx
-from typing import List, Optional
+import json
+import sqlite3
+from typing import Dict, List, Optional, Tuple
 from backend.config.settings import settings
 from backend.models.case import LegalCase
+from backend.services.cache import TTLCache, SingleFlight
+from backend.services.opinion_store import OpinionStore, CachedOpinion
+from backend.services.hybrid_search import get_case_retriever
+
+# Focus on NY state courts and federal courts covering NY
+NY_COURTS = [
+    "ny",          # NY Court of Appeals
+    "nyappdiv",    # NY Appellate Division
+    "nysupct",     # NY Supreme Court
+    "ca2",         # 2nd Circuit (covers NY)
+    "nyed",        # Eastern District of NY
+    "nynd",        # Northern District of NY  
+    "nysd",        # Southern District of NY
+    "nywd",        # Western District of NY
+]
+
+# Shared across the per-request service instances
+search_cache = TTLCache(
+    max_entries=settings.search_cache_max_entries,
+    ttl=settings.search_cache_ttl,
+    stale_ttl=settings.search_cache_stale_ttl
+)
+_refreshing: Dict[Tuple, asyncio.Task] = {}
+
+# Concurrent identical requests share one upstream call and one parsed result
+search_flight = SingleFlight("search")
+opinion_flight = SingleFlight("opinion")
+details_flight = SingleFlight("case_details")
+
+_opinion_store: Optional[OpinionStore] = None
+
+
+def get_opinion_store() -> OpinionStore:
+    """Open the on-disk opinion cache on first use"""
+    global _opinion_store
+    if _opinion_store is None:
+        _opinion_store = OpinionStore(settings.opinion_cache_path, settings.opinion_cache_max_bytes)
+    return _opinion_store
+
+
+def _search_cache_key(query: str, courts: List[str], limit: int) -> Tuple:
+    """Normalize a search so near-identical queries share a cache entry"""
+    normalized_query = " ".join(query.lower().split())
+    return (normalized_query, tuple(sorted(courts)), limit)
+
+
+def _search_local(query: str, limit: int) -> Optional[List[LegalCase]]:
+    """Search the local index; None when there isn't one"""
+    retriever = get_case_retriever()
+    if retriever is None:
+        return None
+    return retriever.search(query, limit)
+
 
 class CourtListenerService:
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.base_url = settings.courtlistener_base_url
         self.api_key = settings.courtlistener_api_key
-        self.client = httpx.AsyncClient()
+        # Shared pooled client from the app lifespan; only close it if we created it
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient()
     
     async def search_cases(self, query: str, limit: int = 5) -> List[LegalCase]:
         """Search for NYC/NY state consumer protection cases"""
+        key = _search_cache_key(query, NY_COURTS, limit)
+        cached = search_cache.get(key)
+        if cached is not None:
+            cases, fresh = cached
+            if not fresh:
+                self._refresh_in_background(key, query, limit)
+            return list(cases)
+        
+        try:
+            cases = await search_flight.do(key, lambda: self._fetch_and_cache_search(key, query, limit))
+        except httpx.HTTPError as e:
+            print(f"CourtListener API error: {e}")
+            return []
+        
+        return list(cases)
+    
+    def _refresh_in_background(self, key: Tuple, query: str, limit: int):
+        """Revalidate a stale search entry without holding up the caller"""
+        if key in _refreshing:
+            return
+        
+        async def refresh():
+            try:
+                await search_flight.do(key, lambda: self._fetch_and_cache_search(key, query, limit))
+            except httpx.HTTPError as e:
+                print(f"CourtListener background refresh error: {e}")
+            finally:
+                _refreshing.pop(key, None)
+        
+        _refreshing[key] = asyncio.create_task(refresh())
+    
+    async def _fetch_and_cache_search(self, key: Tuple, query: str, limit: int) -> List[LegalCase]:
+        cases = await self._search(query, limit)
+        search_cache.set(key, cases)
+        return cases
+    
+    async def _search(self, query: str, limit: int) -> List[LegalCase]:
+        """Answer from the local bulk-data index when built, falling back to the API"""
+        try:
+            # Off the event loop: the first call may load an embedding model
+            cases = await asyncio.to_thread(_search_local, query, limit)
+        except sqlite3.Error as e:
+            print(f"Local case index error: {e}")
+            cases = []
+        if cases or (cases is not None and settings.case_search_backend == "local"):
+            return cases
+        return await self._fetch_search(query, limit)
+    
+    async def _fetch_search(self, query: str, limit: int) -> List[LegalCase]:
+        """Run the /search/ request against CourtListener"""
         headers = {
             "Authorization": f"Token {self.api_key}",
             "Content-Type": "application/json"
         }
         
-        # Focus on NY state courts and federal courts covering NY
-        ny_courts = [
-            "ny",          # NY Court of Appeals
-            "nyappdiv",    # NY Appellate Division
-            "nysupct",     # NY Supreme Court
-            "ca2",         # 2nd Circuit (covers NY)
-            "nyed",        # Eastern District of NY
-            "nynd",        # Northern District of NY  
-            "nysd",        # Southern District of NY
-            "nywd",        # Western District of NY
-        ]
-        
         params = {
             "q": f"consumer protection AND New York AND ({query})",
             "type": "o",  # Opinions
             "order_by": "score desc",
             "stat_Precedential": "on",
-            "court": " ".join(ny_courts),
+            "court": " ".join(NY_COURTS),
         }
         
-        try:
-            response = await self.client.get(
-                f"{self.base_url}/search/",
-                headers=headers,
-                params=params
+        response = await self.client.get(
+            f"{self.base_url}/search/",
+            headers=headers,
+            params=params
+        )
+        response.raise_for_status()
+        
+        data = response.json()
+        cases = []
+        
+        for result in data.get("results", [])[:limit]:
+            case = LegalCase(
+                id=str(result.get("id", "")),
+                cluster_id=str(result["cluster_id"]) if result.get("cluster_id") else None,
+                case_name=result.get("caseName", ""),
+                court=result.get("court", ""),
+                date_filed=result.get("dateFiled"),
+                snippet=result.get("snippet", ""),
+                url=f"https://www.courtlistener.com{result.get('absolute_url', '')}",
+                relevance_score=result.get("score")
             )
-            response.raise_for_status()
-            
-            data = response.json()
-            cases = []
-            
-            for result in data.get("results", [])[:limit]:
-                case = LegalCase(
-                    id=str(result.get("id", "")),
-                    case_name=result.get("caseName", ""),
-                    court=result.get("court", ""),
-                    date_filed=result.get("dateFiled"),
-                    snippet=result.get("snippet", ""),
-                    url=f"https://www.courtlistener.com{result.get('absolute_url', '')}",
-                    relevance_score=result.get("score")
-                )
-                cases.append(case)
-            
-            return cases
-            
-        except httpx.HTTPError as e:
-            print(f"CourtListener API error: {e}")
-            return []
+            cases.append(case)
+        
+        return cases
     
     async def get_case_details(self, case_id: str) -> Optional[dict]:
         """Get detailed case information"""
+        
+        async def load():
+            cached = await self.get_case_details_raw(case_id)
+            if cached is None:
+                return None
+            return json.loads(cached.body)
+        
+        return await details_flight.do(case_id, load)
+    
+    async def get_case_details_raw(self, case_id: str) -> Optional[CachedOpinion]:
+        """Get the opinion payload as stored bytes, revalidating against CourtListener when stale"""
+        return await opinion_flight.do(case_id, lambda: self._load_opinion(case_id))
+    
+    async def _load_opinion(self, case_id: str) -> Optional[CachedOpinion]:
+        store = get_opinion_store()
+        cached = await asyncio.to_thread(store.get, case_id)
+        if cached and cached.is_fresh(settings.opinion_cache_revalidate_after):
+            return cached
+        
         headers = {
             "Authorization": f"Token {self.api_key}",
             "Content-Type": "application/json"
         }
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
         
         try:
             response = await self.client.get(
                 f"{self.base_url}/opinions/{case_id}/",
                 headers=headers
             )
+            if response.status_code == 304 and cached:
+                await asyncio.to_thread(store.touch, case_id)
+                return cached
             response.raise_for_status()
-            return response.json()
             
         except httpx.HTTPError as e:
             print(f"Error fetching case details: {e}")
-            return None
+            # Opinions rarely change, so a stale copy beats no copy
+            return cached
+        
+        return await asyncio.to_thread(
+            store.put,
+            case_id,
+            response.content,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified")
+        )
     
     async def close(self):
-        await self.client.aclose()
\ No newline at end of file
+        if self._owns_client:
+            await self.client.aclose()
\ No newline at end of file
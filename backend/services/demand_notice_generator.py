@@ -1,59 +1,64 @@
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Template
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from backend.config.settings import settings
 from backend.models.demand_notice import DemandNoticeRequest
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-import io
+from backend.services.cache import TTLCache
+from backend.services.pdf_renderer import render_pdf
+import hashlib
+import json
+import os
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+DEMAND_LETTER_TEMPLATE = "demand_letter.md.j2"
+STATEMENT_OF_CLAIM_TEMPLATE = "statement_of_claim.md.j2"
+
+
+def _create_environment() -> Environment:
+    """Template environment shared by every generator; compiled bytecode is cached on disk"""
+    os.makedirs(settings.jinja_bytecode_cache_dir, exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=FileSystemBytecodeCache(settings.jinja_bytecode_cache_dir),
+        auto_reload=settings.debug
+    )
+
+
+template_env = _create_environment()
+
+# Rendered notices keyed by a hash of the normalized request, so the text and
+# PDF downloads of the same notice render it only once
+rendered_cache = TTLCache(
+    max_entries=settings.rendered_notice_cache_max_entries,
+    ttl=settings.rendered_notice_cache_ttl
+)
+
+
+def _render_key(template_name: str, context: Dict[str, Any]) -> str:
+    # Keyed on exactly what the template sees, so equal keys always render the same text
+    raw = json.dumps([template_name, context], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
 
 class DemandNoticeGenerator:
     def __init__(self):
         # NYC Consumer Dispute Template
-        self.template = Template("""# Demand Letter — NYC Consumer Dispute
----
-## Header
-- **From:** {{ complainant_name }}, {{ complainant_address }}, {{ complainant_contact }}
-- **To:** {{ respondent_name }}, {{ respondent_address }}
----
-## 1) Facts (brief)
-- On **{{ incident_date }}**, I purchased **{{ item_service }}** for **${{ amount_claimed or "Amount" }}** from **{{ respondent_name }}**.
-- The product/service was **{{ issue_type }}**.
-- I attempted to resolve this on **{{ resolution_attempts }}** via **{{ contact_method }}**.
----
-## 2) Amount Demanded
-- **${{ amount_claimed or "Amount" }}**, itemized if helpful (purchase price, tax, delivery, other reasonable costs).
----
-## 3) Legal Basis (plain language)
-- **{{ legal_basis }}** resulting in financial loss.
-- *Note:* NYC Small Claims Court hears money claims up to **$10,000**.
----
-## 4) Remedy & Deadline
-- Please remit **${{ amount_claimed or "Amount" }}** within **10 days** of receiving this letter to avoid filing in NYC Small Claims Court.
----
-## 5) Attachments
-- Copies of **receipt/invoice**
-- Copies of **correspondence**
-- **Photos/screenshots**
----
-## Signature
-- **{{ complainant_name }}** — {{ current_date }}
----
-### Legal References
-This demand is made pursuant to NYC Consumer Protection Law and NY General Business Law.
-
-**DISCLAIMER:** This notice is based on AI-generated legal research and should be reviewed by a qualified New York attorney before use.
-        """)
+        self.template = template_env.get_template(DEMAND_LETTER_TEMPLATE)
+        self.claim_template = template_env.get_template(STATEMENT_OF_CLAIM_TEMPLATE)
     
     def generate_notice(self, request: DemandNoticeRequest, case_references: List[str] = None) -> str:
         """Generate the demand notice using NYC template"""
-        
+        return self._render(self.template, request, case_references or [])
+    
+    def generate_statement_of_claim(self, request: DemandNoticeRequest) -> str:
+        """Generate the NYC Small Claims statement of claim from the same intake fields"""
+        return self._render(self.claim_template, request, [])
+    
+    def _render(self, template: Template, request: DemandNoticeRequest, case_references: List[str]) -> str:
         # Parse issue description to extract key details
         issue_details = self._parse_issue_description(request.issue_description)
         
-        return self.template.render(
+        context = dict(
             current_date=datetime.now().strftime("%B %d, %Y"),
             complainant_name=request.complainant_name,
             complainant_address=request.complainant_address,
@@ -67,8 +72,16 @@ This demand is made pursuant to NYC Consumer Protection Law and NY General Busin
             resolution_attempts=issue_details.get('resolution_attempts', 'multiple occasions'),
             contact_method=issue_details.get('contact_method', 'email / phone / in-store'),
             legal_basis=issue_details.get('legal_basis', 'breach of contract / defective goods'),
-            case_references=case_references or []
+            case_references=case_references
         )
+        key = _render_key(template.name, context)
+        cached = rendered_cache.get(key)
+        if cached is not None:
+            return cached[0]
+        
+        content = template.render(**context)
+        rendered_cache.set(key, content)
+        return content
     
     def _parse_issue_description(self, description: str) -> Dict[str, str]:
         """Parse the issue description to extract template variables"""
@@ -110,73 +123,16 @@ This demand is made pursuant to NYC Consumer Protection Law and NY General Busin
         return details
     
     def generate_pdf(self, content: str, filename: str) -> bytes:
-        """Generate PDF from markdown-style content"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, 
-                               rightMargin=72, leftMargin=72,
-                               topMargin=72, bottomMargin=18)
-        
-        # Create styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=12,
-            spaceBefore=12,
-            spaceAfter=6,
-            textColor='#2c3e50'
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=10,
-            spaceBefore=3,
-            spaceAfter=3,
-            leading=12
-        )
-        
-        # Parse content and create PDF elements
-        story = []
-        lines = content.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                story.append(Spacer(1, 6))
-            elif line.startswith('# '):
-                # Main title
-                title_text = line[2:].replace('—', '—')  # Em dash
-                story.append(Paragraph(title_text, title_style))
-            elif line.startswith('## '):
-                # Section heading
-                heading_text = line[3:]
-                story.append(Paragraph(f"<b>{heading_text}</b>", heading_style))
-            elif line.startswith('- **'):
-                # Bold bullet point
-                bullet_text = line[2:]  # Remove '- '
-                story.append(Paragraph(f"• {bullet_text}", normal_style))
-            elif line.startswith('- '):
-                # Regular bullet point
-                bullet_text = line[2:]
-                story.append(Paragraph(f"• {bullet_text}", normal_style))
-            elif line.startswith('---'):
-                # Horizontal line
-                story.append(Spacer(1, 12))
-            else:
-                # Regular paragraph
-                if line:
-                    story.append(Paragraph(line, normal_style))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        return buffer.getvalue()
\ No newline at end of file
+        """Generate PDF from markdown-style content (blocking; routes use pdf_render_pool)"""
+        return render_pdf(content)
+
+
+_generator: Optional[DemandNoticeGenerator] = None
+
+
+def get_demand_notice_generator() -> DemandNoticeGenerator:
+    """Return the process-wide generator (templates are loaded once)"""
+    global _generator
+    if _generator is None:
+        _generator = DemandNoticeGenerator()
+    return _generator
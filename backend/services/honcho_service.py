@@ -3,9 +3,14 @@ Fixed Honcho Service Implementation
 Based on the latest Honcho v2 API using the peer-based model
 """
 
-from typing import List, Optional
+import asyncio
+import functools
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
 from backend.config.settings import settings
 from backend.models.chat import ChatMessage
+from backend.services.write_behind import WriteBehindQueue, PendingMessage
 from datetime import datetime
 
 try:
@@ -15,6 +20,123 @@ except ImportError:
     HONCHO_AVAILABLE = False
     print("Warning: honcho-ai package not installed. Using fallback memory service.")
 
+# The Honcho SDK is synchronous, so its network calls run on a bounded thread pool
+# instead of blocking the event loop
+_honcho_executor: Optional[ThreadPoolExecutor] = None
+_honcho_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_honcho_executor() -> ThreadPoolExecutor:
+    global _honcho_executor
+    if _honcho_executor is None:
+        _honcho_executor = ThreadPoolExecutor(
+            max_workers=settings.honcho_max_workers,
+            thread_name_prefix="honcho"
+        )
+    return _honcho_executor
+
+
+def _get_honcho_semaphore() -> asyncio.Semaphore:
+    # Caps calls queued on the pool so a Honcho outage can't pile up unbounded work
+    global _honcho_semaphore
+    if _honcho_semaphore is None:
+        _honcho_semaphore = asyncio.Semaphore(settings.honcho_max_concurrency)
+    return _honcho_semaphore
+
+
+async def run_blocking(fn: Callable[..., Any], *args) -> Any:
+    """Run a blocking Honcho SDK call off the event loop with a timeout"""
+    loop = asyncio.get_running_loop()
+    semaphore = _get_honcho_semaphore()
+    await semaphore.acquire()
+    try:
+        future = _get_honcho_executor().submit(functools.partial(fn, *args))
+    except BaseException:
+        semaphore.release()
+        raise
+
+    def release(_):
+        # The slot is held until the thread is done, not just until we stop waiting,
+        # so timed-out calls still count against honcho_max_concurrency
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            pass  # Loop already closed at shutdown
+
+    future.add_done_callback(release)
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout=settings.honcho_timeout)
+
+
+def shutdown_honcho_executor():
+    """Stop the Honcho worker threads (called from the app lifespan)"""
+    global _honcho_executor
+    if _honcho_executor is not None:
+        _honcho_executor.shutdown(wait=False, cancel_futures=True)
+        _honcho_executor = None
+
+
+class SessionHistoryStore:
+    """Bounded local chat history: a ring buffer per session, LRU eviction of idle sessions"""
+    
+    def __init__(self, max_messages: int = 50, max_sessions: int = 10000):
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+    
+    def _touch(self, session_id: str, user_id: Optional[str] = None) -> dict:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = {
+                "user_id": user_id,
+                "created_at": datetime.now(),
+                "messages": deque(maxlen=self.max_messages)
+            }
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+    
+    def create_session(self, session_id: str, user_id: str):
+        self._touch(session_id, user_id)
+    
+    def add_message(self, session_id: str, message: ChatMessage):
+        self._touch(session_id)["messages"].append({
+            "role": message.role,
+            "content": message.content,
+            "timestamp": message.timestamp or datetime.now()
+        })
+    
+    def get_messages(self, session_id: str, limit: int = 10) -> List[ChatMessage]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return []
+        self._sessions.move_to_end(session_id)
+        messages = list(session["messages"])[-limit:]
+        return [
+            ChatMessage(
+                role=msg["role"],
+                content=msg["content"],
+                timestamp=msg["timestamp"]
+            )
+            for msg in messages
+        ]
+    
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Shared by all HonchoService instances so reads see writes still waiting to be flushed
+message_write_behind = WriteBehindQueue(
+    batch_size=settings.memory_batch_size,
+    flush_interval=settings.memory_flush_interval
+)
+
+
 class HonchoService:
     def __init__(self):
         self.client = None
@@ -32,8 +154,10 @@ class HonchoService:
                 self.client = None
         
         # Fallback in-memory storage
-        self.fallback_sessions = {}
-        self.fallback_messages = {}
+        self.fallback_store = SessionHistoryStore(
+            max_messages=settings.memory_history_max_messages,
+            max_sessions=settings.memory_max_sessions
+        )
     
     async def create_session(self, user_id: str) -> str:
         """Create a new chat session for a user"""
@@ -41,76 +165,98 @@ class HonchoService:
         
         if self.client:
             try:
-                # Create a peer for the user
-                user_peer = self.client.peer(user_id)
-                
-                # Create a session
-                session = self.client.session(session_id)
-                
-                # Add the user peer to the session
-                session.add_peers([user_peer])
-                
+                await run_blocking(self._create_session_sync, user_id, session_id)
                 print(f"✅ Created Honcho session: {session_id}")
                 return session_id
                 
             except Exception as e:
                 print(f"❌ Error creating Honcho session: {e}")
                 # Fall back to local storage
-                self.fallback_sessions[session_id] = {
-                    "user_id": user_id,
-                    "created_at": datetime.now()
-                }
+                self.fallback_store.create_session(session_id, user_id)
                 return session_id
         
         # Fallback: store locally
-        self.fallback_sessions[session_id] = {
-            "user_id": user_id,
-            "created_at": datetime.now()
-        }
+        self.fallback_store.create_session(session_id, user_id)
         return session_id
     
+    def _create_session_sync(self, user_id: str, session_id: str):
+        # Create a peer for the user
+        user_peer = self.client.peer(user_id)
+        
+        # Create a session
+        session = self.client.session(session_id)
+        
+        # Add the user peer to the session
+        session.add_peers([user_peer])
+    
+    def _add_messages_sync(self, session_id: str, batch: List[PendingMessage]):
+        # Build each peer and the session handle once for the whole batch
+        session = self.client.session(session_id)
+        peers = {}
+        honcho_messages = []
+        
+        for user_id, message in batch:
+            # Assistant messages go to a shared assistant peer
+            peer_id = user_id if message.role == "user" else "assistant"
+            if peer_id not in peers:
+                peers[peer_id] = self.client.peer(peer_id)
+            honcho_messages.append(peers[peer_id].message(message.content))
+        
+        session.add_messages(honcho_messages)
+    
+    def _get_messages_sync(self, session_id: str) -> list:
+        session = self.client.session(session_id)
+        
+        # Get recent messages from the session
+        return list(session.get_messages())
+    
+    def _peer_chat_sync(self, user_id: str, query: str):
+        user_peer = self.client.peer(user_id)
+        return user_peer.chat(query)
+    
     async def add_message(self, user_id: str, session_id: str, message: ChatMessage):
         """Add a message to the conversation history"""
+        if not message.timestamp:
+            message = message.model_copy(update={"timestamp": datetime.now()})
+        
         if self.client:
-            try:
-                # Get the user peer and session
-                user_peer = self.client.peer(user_id)
-                session = self.client.session(session_id)
-                
-                # Create message content
-                if message.role == "user":
-                    # Add user message
-                    session.add_messages([user_peer.message(message.content)])
-                else:
-                    # Add assistant message (create assistant peer if needed)
-                    assistant_peer = self.client.peer("assistant")
-                    session.add_messages([assistant_peer.message(message.content)])
-                
-                print(f"✅ Added message to Honcho session: {session_id}")
-                return
-                
-            except Exception as e:
-                print(f"❌ Error adding message to Honcho: {e}")
-                # Fall back to local storage
+            # Buffered and written to Honcho in per-session batches
+            message_write_behind.enqueue(session_id, user_id, message, self._write_batch)
+            return
         
+        self._store_fallback(session_id, message)
+    
+    async def _write_batch(self, session_id: str, batch: List[PendingMessage]):
+        """Flush one batch of buffered messages to Honcho in a single round trip"""
+        try:
+            await run_blocking(self._add_messages_sync, session_id, batch)
+            print(f"✅ Added {len(batch)} message(s) to Honcho session: {session_id}")
+        except Exception as e:
+            print(f"❌ Error adding messages to Honcho: {e}")
+            # Fall back to local storage
+            for _, message in batch:
+                self._store_fallback(session_id, message)
+    
+    def _store_fallback(self, session_id: str, message: ChatMessage):
         # Fallback: store locally
-        if session_id not in self.fallback_messages:
-            self.fallback_messages[session_id] = []
-        
-        self.fallback_messages[session_id].append({
-            "role": message.role,
-            "content": message.content,
-            "timestamp": message.timestamp or datetime.now()
-        })
+        self.fallback_store.add_message(session_id, message)
     
     async def get_chat_history(self, user_id: str, session_id: str, limit: int = 10) -> List[ChatMessage]:
-        """Get recent chat history for context"""
+        """Get recent chat history for context, including writes not yet flushed"""
+        # Wait out an in-flight batch so it isn't counted both as stored and pending
+        async with message_write_behind.session_lock(session_id):
+            history = await self._load_history(session_id, limit)
+            pending = message_write_behind.pending_messages(session_id)
+        
+        if not pending:
+            return history
+        history = history + pending
+        return history[-limit:] if len(history) > limit else history
+    
+    async def _load_history(self, session_id: str, limit: int) -> List[ChatMessage]:
         if self.client:
             try:
-                session = self.client.session(session_id)
-                
-                # Get recent messages from the session
-                messages = session.get_messages()
+                messages = await run_blocking(self._get_messages_sync, session_id)
                 
                 # Convert to ChatMessage objects
                 chat_history = []
@@ -132,32 +278,17 @@ class HonchoService:
                 # Fall back to local storage
         
         # Fallback: get from local storage
-        if session_id in self.fallback_messages:
-            messages = self.fallback_messages[session_id][-limit:]
-            return [
-                ChatMessage(
-                    role=msg["role"],
-                    content=msg["content"],
-                    timestamp=msg["timestamp"]
-                )
-                for msg in messages
-            ]
-        
-        return []
+        return self.fallback_store.get_messages(session_id, limit)
     
     async def get_user_context(self, user_id: str, query: str = "") -> str:
         """Get context about a user using Honcho's dialectic API"""
         if self.client:
             try:
-                user_peer = self.client.peer(user_id)
-                
                 # Use dialectic API to understand user better
-                if query:
-                    response = user_peer.chat(query)
-                else:
-                    response = user_peer.chat("What are this user's communication preferences and needs?")
+                if not query:
+                    query = "What are this user's communication preferences and needs?"
                 
-                return response
+                return await run_blocking(self._peer_chat_sync, user_id, query)
                 
             except Exception as e:
                 print(f"❌ Error getting user context from Honcho: {e}")
@@ -176,39 +307,21 @@ class SimpleMemoryService:
     """Fallback memory service when Honcho is not available"""
     
     def __init__(self):
-        self.sessions = {}
-        self.messages = {}
+        self.store = SessionHistoryStore(
+            max_messages=settings.memory_history_max_messages,
+            max_sessions=settings.memory_max_sessions
+        )
     
     async def create_session(self, user_id: str) -> str:
         session_id = f"session_{user_id}_{int(datetime.now().timestamp())}"
-        self.sessions[session_id] = {
-            "user_id": user_id,
-            "created_at": datetime.now()
-        }
+        self.store.create_session(session_id, user_id)
         return session_id
     
     async def add_message(self, user_id: str, session_id: str, message: ChatMessage):
-        if session_id not in self.messages:
-            self.messages[session_id] = []
-        
-        self.messages[session_id].append({
-            "role": message.role,
-            "content": message.content,
-            "timestamp": message.timestamp or datetime.now()
-        })
+        self.store.add_message(session_id, message)
     
     async def get_chat_history(self, user_id: str, session_id: str, limit: int = 10) -> List[ChatMessage]:
-        if session_id in self.messages:
-            messages = self.messages[session_id][-limit:]
-            return [
-                ChatMessage(
-                    role=msg["role"],
-                    content=msg["content"],
-                    timestamp=msg["timestamp"]
-                )
-                for msg in messages
-            ]
-        return []
+        return self.store.get_messages(session_id, limit)
     
     async def get_user_context(self, user_id: str, query: str = "") -> str:
         return "Using simple memory service - no advanced context available."
@@ -217,10 +330,30 @@ class SimpleMemoryService:
         pass
 
 
+_memory_service = None
+
+
 # Export the appropriate service
 def get_memory_service():
-    """Factory function to get the appropriate memory service"""
-    if HONCHO_AVAILABLE:
-        return HonchoService()
-    else:
-        return SimpleMemoryService()
\ No newline at end of file
+    """Return the process-wide memory service, creating it on first use"""
+    global _memory_service
+    if _memory_service is None:
+        backend = settings.memory_backend
+        if backend == "sqlite":
+            from backend.services.sqlite_memory import SqliteMemoryService
+            _memory_service = SqliteMemoryService()
+        elif backend == "honcho" or (backend == "auto" and HONCHO_AVAILABLE):
+            _memory_service = HonchoService()
+        else:
+            _memory_service = SimpleMemoryService()
+    return _memory_service
+
+
+async def close_memory_service():
+    """Flush pending writes and release the memory service (called from the app lifespan)"""
+    global _memory_service
+    await message_write_behind.flush_all()
+    if _memory_service is not None:
+        await _memory_service.close()
+        _memory_service = None
+    shutdown_honcho_executor()
\ No newline at end of file
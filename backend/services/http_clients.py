@@ -0,0 +1,72 @@
+"""
+Shared HTTP connection pools for upstream services.
+One long-lived httpx.AsyncClient per upstream host, created in the app lifespan
+"""
+
+import httpx
+from typing import Dict
+from backend.config.settings import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+    print("Warning: h2 package not installed. Upstream clients will use HTTP/1.1.")
+
+OPENROUTER = "openrouter"
+COURTLISTENER = "courtlistener"
+FLOWGLAD = "flowglad"
+SUPABASE = "supabase"
+
+
+class HTTPClientPool:
+    """Registry of pooled clients keyed by upstream name"""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _max_connections(self, upstream: str) -> int:
+        return {
+            OPENROUTER: settings.openrouter_max_connections,
+            COURTLISTENER: settings.courtlistener_max_connections,
+            FLOWGLAD: settings.flowglad_max_connections,
+            SUPABASE: settings.supabase_max_connections,
+        }.get(upstream, settings.http_max_connections)
+
+    def _create_client(self, upstream: str) -> httpx.AsyncClient:
+        max_connections = self._max_connections(upstream)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(settings.http_max_keepalive_connections, max_connections),
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+        timeout = httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout)
+        return httpx.AsyncClient(
+            http2=settings.http2_enabled and HTTP2_AVAILABLE,
+            limits=limits,
+            timeout=timeout
+        )
+
+    async def startup(self):
+        """Open one pooled client per upstream"""
+        for upstream in (OPENROUTER, COURTLISTENER, FLOWGLAD, SUPABASE):
+            self.get(upstream)
+
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        """Return the shared client for an upstream, creating it on first use"""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = self._create_client(upstream)
+            self._clients[upstream] = client
+        return client
+
+    async def close(self):
+        """Close every pooled client"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+http_clients = HTTPClientPool()
+
@@ -0,0 +1,283 @@
+"""
+Hybrid retrieval: BM25 keyword hits fused with dense-vector hits.
+Case vectors live in a memory-mapped NumPy matrix built by
+scripts/build_case_vectors.py; rankings are merged with reciprocal rank fusion
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from backend.config.settings import settings
+from backend.models.case import LegalCase
+from backend.services.bm25 import BM25Index, SearchHit
+from backend.services.case_index import CaseIndex, get_case_index
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("Warning: numpy not installed. Case search will use keyword ranking only.")
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Merge ranked lists by sum(1 / (k + rank)); needs no score calibration between retrievers"""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HashingEmbedder:
+    """Hashed TF-IDF vectors: words plus character 4-grams, so related word forms overlap"""
+
+    name = "hashing"
+
+    def __init__(self, dim: int, idf: Optional["np.ndarray"] = None):
+        self.dim = dim
+        self.idf = idf
+
+    def _features(self, text: str) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        for word in WORD_RE.findall(text.lower()):
+            grams = [word] + [f"#{word[i:i + 4]}" for i in range(max(1, len(word) - 3))] if len(word) > 4 else [word]
+            for gram in grams:
+                digest = hashlib.blake2b(gram.encode(), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                # The hash's sign bit spreads collisions around zero instead of piling them up
+                sign = 1.0 if digest[4] & 1 else -1.0
+                counts[bucket] = counts.get(bucket, 0.0) + sign
+        return counts
+
+    def document_frequencies(self, texts: Iterable[str]) -> Tuple["np.ndarray", int]:
+        df = np.zeros(self.dim, dtype=np.float64)
+        total = 0
+        for text in texts:
+            df[list(self._features(text))] += 1
+            total += 1
+        return df, total
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, count in self._features(text).items():
+                # Sublinear tf keeps long opinions from drowning out the rare terms
+                vectors[row, bucket] = math.copysign(1.0 + math.log(abs(count)), count) if count else 0.0
+        if self.idf is not None:
+            vectors *= self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class ModelEmbedder:
+    """Small CPU sentence-embedding model (sentence-transformers)"""
+
+    def __init__(self, model_name: str):
+        self.name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        return self.model.encode(
+            list(texts), batch_size=32, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def min_similarity(embedder) -> float:
+    """Calibrated cosine cut-off for dense hits from this embedder"""
+    if isinstance(embedder, HashingEmbedder):
+        return settings.hybrid_min_similarity_hashing
+    return settings.hybrid_min_similarity_model
+
+
+def create_embedder(idf: Optional["np.ndarray"] = None):
+    """Embedding model if requested and installed, else hashed TF-IDF"""
+    if settings.embedding_backend in ("auto", "model") and SENTENCE_TRANSFORMERS_AVAILABLE:
+        try:
+            return ModelEmbedder(settings.embedding_model)
+        except Exception as e:
+            print(f"Could not load embedding model {settings.embedding_model}: {e}")
+    return HashingEmbedder(settings.embedding_dim, idf)
+
+
+class VectorStore:
+    """Row-aligned ids and a float32 matrix on disk, opened with mmap so pages load on demand"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        with open(f"{prefix}.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.ids = np.load(f"{prefix}.ids.npy")
+        self.matrix = np.memmap(
+            f"{prefix}.f32", dtype=np.float32, mode="r", shape=(len(self.ids), self.meta["dim"])
+        )
+        self.idf = np.load(f"{prefix}.idf.npy") if os.path.exists(f"{prefix}.idf.npy") else None
+
+    @staticmethod
+    def exists(prefix: str) -> bool:
+        return os.path.exists(f"{prefix}.json") and os.path.exists(f"{prefix}.f32")
+
+    @staticmethod
+    def write(prefix: str, batches: Iterable[Tuple[List[int], "np.ndarray"]], dim: int, embedder: str,
+              idf: Optional["np.ndarray"] = None) -> int:
+        """Stream (ids, vectors) batches to disk; returns the row count"""
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        ids: List[int] = []
+        # Write under temporary names and rename, so running servers never map a partial file
+        with open(f"{prefix}.f32.tmp", "wb") as f:
+            for batch_ids, vectors in batches:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                ids.extend(batch_ids)
+        np.save(f"{prefix}.ids.tmp.npy", np.asarray(ids, dtype=np.int64))
+        if idf is not None:
+            np.save(f"{prefix}.idf.tmp.npy", idf)
+            os.replace(f"{prefix}.idf.tmp.npy", f"{prefix}.idf.npy")
+        os.replace(f"{prefix}.ids.tmp.npy", f"{prefix}.ids.npy")
+        os.replace(f"{prefix}.f32.tmp", f"{prefix}.f32")
+        with open(f"{prefix}.json", "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "rows": len(ids), "embedder": embedder}, f)
+        return len(ids)
+
+    def top_k(self, query: "np.ndarray", k: int, batch_rows: int = 65536) -> List[Tuple[int, float]]:
+        """Cosine top-k by blocked matrix-vector products, merging each block's partial top-k"""
+        best_ids: List["np.ndarray"] = []
+        best_scores: List["np.ndarray"] = []
+        for start in range(0, len(self.ids), batch_rows):
+            scores = self.matrix[start:start + batch_rows] @ query
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(len(scores))
+            best_ids.append(self.ids[start + top])
+            best_scores.append(scores[top])
+        if not best_ids:
+            return []
+        ids = np.concatenate(best_ids)
+        scores = np.concatenate(best_scores)
+        order = np.argsort(-scores)[:k]
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+class HybridCaseRetriever:
+    """Drop-in for CaseIndex.search: FTS5 bm25 ranking fused with dense vector ranking"""
+
+    def __init__(self, index: CaseIndex, vectors: VectorStore, embedder):
+        self.index = index
+        self.vectors = vectors
+        self.embedder = embedder
+
+    def search(self, query: str, limit: int = 5) -> List[LegalCase]:
+        depth = max(limit * 4, settings.hybrid_search_depth)
+        keyword_hits = self.index.search(query, depth)
+        if not keyword_hits:
+            # No indexed opinion shares a single term with the query, so dense neighbours would
+            # only be noise; the caller falls back to the remote API
+            return []
+        query_vector = self.embedder.embed([query])[0]
+        # Nearest neighbours always exist; only ones above the embedder's noise floor count
+        threshold = min_similarity(self.embedder)
+        dense_hits = [hit for hit in self.vectors.top_k(query_vector, depth) if hit[1] >= threshold]
+
+        by_id: Dict[int, LegalCase] = {int(case.cluster_id): case for case in keyword_hits}
+        fused = reciprocal_rank_fusion(
+            [[int(case.cluster_id) for case in keyword_hits], [cluster_id for cluster_id, _ in dense_hits]],
+            k=settings.hybrid_rrf_k
+        )[:limit]
+        # Cases only the dense retriever found still need their metadata
+        missing = [cluster_id for cluster_id, _ in fused if cluster_id not in by_id]
+        by_id.update(self.index.get_cases(missing))
+
+        cases = []
+        for cluster_id, score in fused:
+            case = by_id.get(cluster_id)
+            if case is not None:
+                cases.append(case.model_copy(update={"relevance_score": score}))
+        return cases
+
+
+class HybridKnowledgeRetriever:
+    """BM25 knowledge-base search fused with hashed TF-IDF vectors held in memory"""
+
+    def __init__(self, index: BM25Index):
+        self.index = index
+        self.embedder = HashingEmbedder(settings.embedding_dim)
+        self._lock = threading.Lock()
+        self._built_for = -1
+        self._chunks: list = []
+        self._matrix = None
+
+    def _vectors(self):
+        # Re-embed whenever the BM25 index has been rebuilt for edited files
+        with self._lock:
+            if self._built_for != self.index.builds:
+                chunks = self.index.chunks
+                texts = [f"{chunk.heading}\n{chunk.text}" for chunk in chunks]
+                df, total = self.embedder.document_frequencies(texts)
+                self.embedder.idf = np.log((1 + total) / (1 + df)).astype(np.float32) + 1.0
+                self._matrix = self.embedder.embed(texts) if texts else np.zeros((0, self.embedder.dim), np.float32)
+                self._chunks = chunks
+                self._built_for = self.index.builds
+            return self._chunks, self._matrix
+
+    def search(self, query: str, limit: int = 5) -> List[SearchHit]:
+        keyword_hits = self.index.search(query, max(limit * 4, 20))
+        chunks, matrix = self._vectors()
+        if not chunks:
+            return keyword_hits[:limit]
+        scores = matrix @ self.embedder.embed([query])[0]
+        dense_order = np.argsort(-scores)[:max(limit * 4, 20)]
+
+        positions = {id(chunk): position for position, chunk in enumerate(chunks)}
+        fused = reciprocal_rank_fusion(
+            [[positions[id(hit.chunk)] for hit in keyword_hits if id(hit.chunk) in positions],
+             [int(position) for position in dense_order if scores[position] >= min_similarity(self.embedder)]],
+            k=settings.hybrid_rrf_k
+        )[:limit]
+        return [SearchHit(chunks[position], score) for position, score in fused]
+
+
+_case_retriever = None
+_case_retriever_lock = threading.Lock()
+
+
+def get_case_retriever():
+    """Search backend for the local case index: hybrid when vectors are built, else plain FTS5"""
+    global _case_retriever
+    index = get_case_index()
+    if index is None:
+        return None
+    if _case_retriever is None:
+        with _case_retriever_lock:
+            if _case_retriever is None:
+                _case_retriever = _create_case_retriever(index)
+    return _case_retriever
+
+
+def _create_case_retriever(index: CaseIndex):
+    prefix = settings.case_vectors_path
+    if not settings.hybrid_search_enabled or not NUMPY_AVAILABLE or not VectorStore.exists(prefix):
+        return index
+    vectors = VectorStore(prefix)
+    if vectors.meta["embedder"] == HashingEmbedder.name:
+        embedder = HashingEmbedder(vectors.meta["dim"], vectors.idf)
+    elif SENTENCE_TRANSFORMERS_AVAILABLE:
+        embedder = ModelEmbedder(vectors.meta["embedder"])
+    else:
+        print(f"Case vectors were built with {vectors.meta['embedder']}, which isn't installed; using keyword search")
+        return index
+    return HybridCaseRetriever(index, vectors, embedder)
@@ -0,0 +1,35 @@
+"""
+Procedural knowledge base: NYC Small Claims fees, filing steps, venues, service
+of process and FAQs, searched locally with BM25
+"""
+
+from typing import Optional
+from backend.config.settings import settings
+from backend.services.bm25 import BM25Index
+from backend.services.hybrid_search import HybridKnowledgeRetriever, NUMPY_AVAILABLE
+
+_knowledge_base: Optional[BM25Index] = None
+
+
+def get_knowledge_base() -> BM25Index:
+    """Index the knowledge base on first use; later searches pick up edited files"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        _knowledge_base = BM25Index(
+            settings.knowledge_base_dir,
+            check_interval=settings.knowledge_base_check_interval
+        )
+    return _knowledge_base
+
+
+_knowledge_retriever: Optional[HybridKnowledgeRetriever] = None
+
+
+def get_knowledge_retriever():
+    """Hybrid BM25 + vector search when numpy is installed, else BM25 alone"""
+    global _knowledge_retriever
+    if not (settings.hybrid_search_enabled and NUMPY_AVAILABLE):
+        return get_knowledge_base()
+    if _knowledge_retriever is None:
+        _knowledge_retriever = HybridKnowledgeRetriever(get_knowledge_base())
+    return _knowledge_retriever
@@ -0,0 +1,499 @@
+"""
+Background demand-notice jobs.
+The history fetch, case search and PDF render run on a worker pool instead of
+inside the HTTP request; job state lives in SQLite so a restart resumes work
+"""
+
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from backend.config.settings import settings
+from backend.models.demand_notice import DemandNoticeRequest, DemandNoticeResponse
+from backend.services.court_listener import CourtListenerService
+from backend.services.demand_notice_generator import get_demand_notice_generator
+from backend.services.honcho_service import get_memory_service
+from backend.services.http_clients import http_clients, COURTLISTENER
+from backend.services.pdf_cache import get_pdf_cache, content_key
+from backend.services.pdf_renderer import pdf_render_pool, PDFPoolSaturated
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETE = "complete"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notice_jobs (
+    job_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    callback_url TEXT,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notice_jobs_status ON notice_jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_notice_jobs_user_status ON notice_jobs(user_id, status);
+"""
+
+# Columns added after the first release, for job stores created before them
+MIGRATIONS = {"owner": "TEXT", "lease_expires": "REAL"}
+
+
+class CallbackURLRejected(ValueError):
+    """A callback URL that could reach internal services"""
+
+
+def _public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_callback_url(url: str):
+    """Allow only https URLs whose host resolves exclusively to public addresses.
+
+    Checked on submit and again before each POST, since DNS can change in between.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != "https" or not parts.hostname:
+        raise CallbackURLRejected("Callback URL must be an https URL")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parts.hostname, parts.port or 443, type=socket.SOCK_STREAM
+        )
+    except (socket.gaierror, UnicodeError):
+        raise CallbackURLRejected(f"Callback host {parts.hostname} does not resolve")
+    if not infos or not all(_public_address(info[4][0]) for info in infos):
+        raise CallbackURLRejected("Callback URL must not point to a private, loopback or link-local address")
+
+
+async def _with_timeout(stage: str, coro, timeout: float, default):
+    """Run one pipeline stage with its own timeout, degrading to a default"""
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"Demand notice stage '{stage}' timed out after {timeout}s")
+        return default
+    except Exception as e:
+        print(f"Demand notice stage '{stage}' failed: {e}")
+        return default
+
+
+async def find_case_references(request: DemandNoticeRequest, court_service: CourtListenerService) -> List[str]:
+    """Search NY case law using the issue and the user's side of the conversation"""
+    chat_history = await _with_timeout(
+        "history",
+        get_memory_service().get_chat_history(request.user_id, request.session_id, limit=20),
+        settings.chat_history_timeout,
+        []
+    )
+    conversation_text = " ".join([msg.content for msg in chat_history if msg.role == "user"])
+    return await search_case_references(court_service, request.issue_description, conversation_text)
+
+
+async def search_case_references(
+    court_service: CourtListenerService, issue_description: str, conversation_text: str = ""
+) -> List[str]:
+    relevant_cases = await _with_timeout(
+        "retrieval",
+        court_service.search_cases(
+            f"NYC consumer protection {issue_description} {conversation_text}".strip(), limit=3
+        ),
+        settings.chat_retrieval_timeout,
+        []
+    )
+    return [f"{case.case_name} ({case.court})" for case in relevant_cases]
+
+
+class JobStore:
+    """SQLite table of demand-notice jobs"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(notice_jobs)")}
+            for column, column_type in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE notice_jobs ADD COLUMN {column} {column_type}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; callers run us via asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, user_id: str, request: dict, callback_url: Optional[str]):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """INSERT INTO notice_jobs (job_id, user_id, status, request, callback_url, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, user_id, QUEUED, json.dumps(request), callback_url, now, now)
+            )
+
+    def claim(self, job_id: str, owner: str, lease: float) -> bool:
+        """Atomically take a queued job, or a running one whose owner's lease ran out"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE notice_jobs SET status = ?, owner = ?, lease_expires = ?, updated_at = ?
+                   WHERE job_id = ? AND (status = ? OR (status = ? AND COALESCE(lease_expires, 0) < ?))""",
+                (RUNNING, owner, now + lease, now, job_id, QUEUED, RUNNING, now)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, job_id: str, owner: str):
+        """Hand a claimed job back to the queue"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """UPDATE notice_jobs SET status = ?, owner = NULL, lease_expires = NULL, updated_at = ?
+                   WHERE job_id = ? AND owner = ?""",
+                (QUEUED, time.time(), job_id, owner)
+            )
+
+    def finish(
+        self, job_id: str, owner: str, status: str, result: Optional[dict] = None, error: Optional[str] = None
+    ) -> bool:
+        """Record the outcome; False if another process has taken the job over"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE notice_jobs SET status = ?, result = ?, error = ?, lease_expires = NULL, updated_at = ?
+                   WHERE job_id = ? AND owner = ? AND status = ?""",
+                (status, json.dumps(result) if result is not None else None, error, time.time(),
+                 job_id, owner, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            """SELECT job_id, user_id, status, request, callback_url, result, error, created_at, updated_at
+               FROM notice_jobs WHERE job_id = ?""",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, user_id, status, request, callback_url, result, error, created_at, updated_at = row
+        return {
+            "job_id": job_id,
+            "user_id": user_id,
+            "status": status,
+            "request": json.loads(request),
+            "callback_url": callback_url,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def claimable(self) -> List[Dict[str, str]]:
+        """Queued jobs plus running ones whose lease has expired, oldest first"""
+        rows = self._connect().execute(
+            """SELECT job_id, user_id FROM notice_jobs
+               WHERE status = ? OR (status = ? AND COALESCE(lease_expires, 0) < ?)
+               ORDER BY created_at""",
+            (QUEUED, RUNNING, time.time())
+        ).fetchall()
+        return [{"job_id": job_id, "user_id": user_id} for job_id, user_id in rows]
+
+    def purge(self, older_than: float) -> int:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM notice_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (COMPLETE, FAILED, older_than)
+            )
+        return cursor.rowcount
+
+
+class JobQueueFull(Exception):
+    """The user already has the maximum number of unfinished jobs"""
+
+
+class NoticeJobQueue:
+    """Worker pool that runs demand-notice jobs, taking users' jobs round-robin.
+
+    Several processes can share one job store: a job runs only in the process
+    that claims it, and a claim is a lease that others may take over once it
+    expires (the owner crashed or was restarted).
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_pending_per_user: int):
+        self.store = store
+        self.workers = workers
+        self.max_pending_per_user = max_pending_per_user
+        # Identifies this process's claims in the shared store
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # user_id -> job ids waiting for a worker, plus the order users are served in
+        self._pending: Dict[str, Deque[str]] = {}
+        self._rotation: Deque[str] = deque()
+        self._unfinished: Dict[str, int] = {}
+        self._known: set = set()  # Job ids queued, running or waiting to retry in this process
+        self._attempts: Dict[str, int] = {}
+        self._ready: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: set = set()
+        self._callback_client: Optional[httpx.AsyncClient] = None
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    async def start(self):
+        """Pick up claimable jobs from the store and start the workers"""
+        if self._tasks:
+            return
+        self._ready = asyncio.Condition()
+        # Redirects are not followed, so a vetted callback URL can't bounce to an internal host
+        self._callback_client = httpx.AsyncClient(timeout=settings.http_timeout, follow_redirects=False)
+        await asyncio.to_thread(self.store.purge, time.time() - settings.notice_job_retention)
+        resumed = await self._sweep()
+        if resumed:
+            print(f"Resuming {resumed} unfinished demand notice jobs")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def close(self):
+        # Running jobs stay claimed in SQLite until their lease expires, then any process retakes them
+        for task in self._tasks + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        self._retries.clear()
+        self._pending.clear()
+        self._rotation.clear()
+        self._unfinished.clear()
+        self._known.clear()
+        self._attempts.clear()
+        if self._callback_client is not None:
+            await self._callback_client.aclose()
+            self._callback_client = None
+
+    def _enqueue(self, job_id: str, user_id: str):
+        queue = self._pending.get(user_id)
+        if queue is None:
+            queue = self._pending[user_id] = deque()
+            self._rotation.append(user_id)
+        queue.append(job_id)
+
+    def _push(self, job_id: str, user_id: str):
+        self._enqueue(job_id, user_id)
+        self._known.add(job_id)
+        self._unfinished[user_id] = self._unfinished.get(user_id, 0) + 1
+
+    def _forget(self, job_id: str, user_id: str):
+        self._known.discard(job_id)
+        self._attempts.pop(job_id, None)
+        remaining = self._unfinished.get(user_id, 1) - 1
+        if remaining:
+            self._unfinished[user_id] = remaining
+        else:
+            self._unfinished.pop(user_id, None)
+
+    async def _sweep(self) -> int:
+        """Queue claimable jobs this process isn't already handling"""
+        jobs = await asyncio.to_thread(self.store.claimable)
+        added = 0
+        async with self._ready:
+            for job in jobs:
+                if job["job_id"] not in self._known:
+                    self._push(job["job_id"], job["user_id"])
+                    added += 1
+            if added:
+                self._ready.notify(added)
+        return added
+
+    async def _sweeper(self):
+        # Finds jobs submitted to other processes and ones whose owner died mid-run
+        while True:
+            await asyncio.sleep(settings.notice_job_sweep_interval)
+            try:
+                await self._sweep()
+            except sqlite3.Error as e:
+                print(f"❌ Demand notice job sweep failed: {e}")
+
+    async def submit(self, request: DemandNoticeRequest, callback_url: Optional[str] = None) -> str:
+        if self._unfinished.get(request.user_id, 0) >= self.max_pending_per_user:
+            raise JobQueueFull()
+        if callback_url:
+            await check_callback_url(callback_url)
+        job_id = uuid.uuid4().hex
+        payload = request.model_dump()
+        await asyncio.to_thread(self.store.create, job_id, request.user_id, payload, callback_url)
+        async with self._ready:
+            self._push(job_id, request.user_id)
+            self._ready.notify()
+        return job_id
+
+    async def _next_job(self) -> Tuple[str, str]:
+        async with self._ready:
+            await self._ready.wait_for(lambda: self._rotation)
+            # Take one job from the user at the front, then send them to the back of the line
+            user_id = self._rotation.popleft()
+            queue = self._pending[user_id]
+            job_id = queue.popleft()
+            if queue:
+                self._rotation.append(user_id)
+            else:
+                del self._pending[user_id]
+            return job_id, user_id
+
+    def _retry_later(self, job_id: str, user_id: str, delay: float):
+        async def requeue():
+            await asyncio.sleep(delay)
+            async with self._ready:
+                self._enqueue(job_id, user_id)
+                self._ready.notify()
+
+        task = asyncio.create_task(requeue())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _worker(self):
+        while True:
+            job_id, user_id = await self._next_job()
+            retry_in = None
+            try:
+                retry_in = await self._process(job_id)
+            except Exception as e:
+                # Includes SQLite errors; the job stays in the store and a later sweep retries it
+                print(f"❌ Demand notice job {job_id} crashed: {e}")
+            if retry_in is None:
+                self._forget(job_id, user_id)
+            else:
+                self._retry_later(job_id, user_id, retry_in)
+
+    async def _process(self, job_id: str) -> Optional[float]:
+        """Run a job if this process wins the claim; returns a retry delay or None"""
+        if not await asyncio.to_thread(self.store.claim, job_id, self.owner, settings.notice_job_lease):
+            # Finished, or another process holds it
+            return None
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return None
+        return await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> Optional[float]:
+        job_id = job["job_id"]
+        result, error = None, None
+        try:
+            result = await asyncio.wait_for(
+                self._generate(DemandNoticeRequest(**job["request"])),
+                timeout=settings.notice_job_timeout
+            )
+        except PDFPoolSaturated:
+            attempts = self._attempts.get(job_id, 0) + 1
+            if attempts <= settings.notice_job_max_retries:
+                # Saturation is temporary: hand the job back and try again after a backoff
+                self._attempts[job_id] = attempts
+                self.retried += 1
+                await asyncio.to_thread(self.store.release, job_id, self.owner)
+                return min(settings.pdf_retry_after * 2 ** (attempts - 1), 60)
+            error = f"PDF renderer still busy after {attempts - 1} retries"
+        except asyncio.TimeoutError:
+            error = f"Timed out after {settings.notice_job_timeout}s"
+        except Exception as e:
+            error = str(e)
+
+        status = FAILED if error is not None else COMPLETE
+        if not await asyncio.to_thread(self.store.finish, job_id, self.owner, status, result, error):
+            # Our lease expired and another process took the job; its outcome and callback win
+            print(f"Demand notice job {job_id} was taken over by another worker")
+            return None
+        if status == COMPLETE:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+        if job["callback_url"]:
+            await self._notify(job_id, job["callback_url"])
+        return None
+
+    async def _generate(self, request: DemandNoticeRequest) -> dict:
+        court_service = CourtListenerService(client=http_clients.get(COURTLISTENER))
+        case_references = await find_case_references(request, court_service)
+
+        generator = get_demand_notice_generator()
+        notice_content = generator.generate_notice(request, case_references)
+
+        # Render into the shared PDF cache so the download is a static file
+        key = content_key(notice_content)
+        cache = get_pdf_cache()
+        if await asyncio.to_thread(cache.get, key) is None:
+            pdf = await pdf_render_pool.render(notice_content)
+            await asyncio.to_thread(cache.put, key, pdf)
+
+        response = DemandNoticeResponse(
+            notice_content=notice_content,
+            case_references=case_references,
+            filename=f"nyc_demand_notice_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        )
+        return {**response.model_dump(), "pdf_key": key}
+
+    async def _notify(self, job_id: str, callback_url: str):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        body = {
+            "job_id": job_id,
+            "status": job["status"],
+            "result": job["result"],
+            "error": job["error"],
+        }
+        try:
+            # Re-checked at send time: the host may resolve differently than at submit
+            await check_callback_url(callback_url)
+            response = await self._callback_client.post(callback_url, json=body)
+            response.raise_for_status()
+        except (CallbackURLRejected, httpx.HTTPError) as e:
+            print(f"Demand notice job {job_id} callback failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": sum(len(queue) for queue in self._pending.values()),
+            "users_waiting": len(self._rotation),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+
+_notice_job_queue: Optional[NoticeJobQueue] = None
+
+
+def get_notice_job_queue() -> NoticeJobQueue:
+    """Create the job queue on first use; the app lifespan starts and stops it"""
+    global _notice_job_queue
+    if _notice_job_queue is None:
+        _notice_job_queue = NoticeJobQueue(
+            JobStore(settings.notice_job_store_path),
+            workers=settings.notice_job_workers,
+            max_pending_per_user=settings.notice_job_max_pending_per_user
+        )
+    return _notice_job_queue
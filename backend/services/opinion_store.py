@@ -0,0 +1,141 @@
+"""
+Persistent content-addressed store for CourtListener opinion payloads.
+Bodies are kept gzip-compressed in SQLite so every uvicorn worker on the host
+shares one cache that survives restarts
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS opinions (
+    case_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_opinions_accessed_at ON opinions(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_opinions_sha256 ON opinions(sha256);
+"""
+
+
+@dataclass
+class CachedOpinion:
+    case_id: str
+    body_gzip: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    @property
+    def body(self) -> bytes:
+        return gzip.decompress(self.body_gzip)
+
+    def is_fresh(self, max_age: float) -> bool:
+        return time.time() - self.fetched_at < max_age
+
+
+class OpinionStore:
+    """SQLite-backed opinion cache with a byte-size budget and LRU eviction"""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; callers run us via asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, case_id: str) -> Optional[CachedOpinion]:
+        conn = self._connect()
+        row = conn.execute(
+            """SELECT o.etag, o.last_modified, o.fetched_at, b.body
+               FROM opinions o JOIN blobs b ON b.sha256 = o.sha256
+               WHERE o.case_id = ?""",
+            (case_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE opinions SET accessed_at = ? WHERE case_id = ?", (time.time(), case_id))
+        etag, last_modified, fetched_at, body = row
+        return CachedOpinion(case_id, body, etag, last_modified, fetched_at)
+
+    def put(
+        self, case_id: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> CachedOpinion:
+        sha256 = hashlib.sha256(body).hexdigest()
+        compressed = gzip.compress(body, compresslevel=6)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, body, size) VALUES (?, ?, ?)",
+                (sha256, compressed, len(compressed))
+            )
+            conn.execute(
+                """INSERT INTO opinions (case_id, sha256, etag, last_modified, fetched_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(case_id) DO UPDATE SET
+                       sha256 = excluded.sha256, etag = excluded.etag,
+                       last_modified = excluded.last_modified,
+                       fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at""",
+                (case_id, sha256, etag, last_modified, now, now)
+            )
+            self._evict(conn)
+        return CachedOpinion(case_id, compressed, etag, last_modified, now)
+
+    def touch(self, case_id: str):
+        """Mark an entry as revalidated (upstream answered 304 Not Modified)"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE opinions SET fetched_at = ?, accessed_at = ? WHERE case_id = ?",
+                (now, now, case_id)
+            )
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently accessed opinions until the blobs fit the byte budget"""
+        conn.execute("DELETE FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM opinions)")
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = conn.execute(
+                "SELECT case_id FROM opinions ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            conn.execute("DELETE FROM opinions WHERE case_id = ?", oldest)
+            conn.execute("DELETE FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM opinions)")
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        opinions = conn.execute("SELECT COUNT(*) FROM opinions").fetchone()[0]
+        blobs, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"opinions": opinions, "blobs": blobs, "bytes": size, "max_bytes": self.max_bytes}
@@ -1,71 +1,172 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
 import httpx
 from typing import Dict, Any, Optional
 from backend.config.settings import settings
 
+# Product/price ids keyed by demand notice price, shared across requests and
+# persisted so restarts don't create new Flowglad products
+_catalog: Dict[str, Dict[str, str]] = {}
+_catalog_lock = asyncio.Lock()
+
+
+def _price_key() -> str:
+    return f"{settings.demand_notice_price:.2f}"
+
+
+def _load_catalog() -> Dict[str, Dict[str, str]]:
+    try:
+        with open(settings.flowglad_catalog_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_catalog(catalog: Dict[str, Dict[str, str]]):
+    directory = os.path.dirname(settings.flowglad_catalog_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{settings.flowglad_catalog_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp_path, settings.flowglad_catalog_path)
+
+
+def checkout_idempotency_key(user_id: str, retry_token: str) -> str:
+    """Upstream key for a client's retry token, scoped per user so tokens can't collide across users"""
+    raw = f"{user_id}:{retry_token}"
+    return f"checkout-{hashlib.sha256(raw.encode()).hexdigest()[:32]}"
+
+def verify_webhook_signature(payload: bytes, headers: Dict[str, str]) -> bool:
+    """Check a Flowglad webhook signature (Standard Webhooks / Svix scheme)"""
+    secret = settings.flowglad_webhook_secret
+    event_id = headers.get("webhook-id") or headers.get("svix-id")
+    timestamp = headers.get("webhook-timestamp") or headers.get("svix-timestamp")
+    signatures = headers.get("webhook-signature") or headers.get("svix-signature")
+    if not (secret and event_id and timestamp and signatures):
+        return False
+    
+    try:
+        if abs(time.time() - int(timestamp)) > settings.flowglad_webhook_tolerance:
+            return False
+        key = base64.b64decode(secret.removeprefix("whsec_"))
+    except ValueError:
+        return False
+    
+    signed_content = f"{event_id}.{timestamp}.".encode() + payload
+    expected = base64.b64encode(hmac.new(key, signed_content, hashlib.sha256).digest()).decode()
+    
+    # The header may carry several space-separated "v1,<signature>" entries during key rotation
+    for entry in signatures.split():
+        version, _, signature = entry.partition(",")
+        if version == "v1" and hmac.compare_digest(signature, expected):
+            return True
+    return False
+
+
 class FlowgladService:
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.secret_key = settings.flowglad_secret_key
         self.base_url = "https://api.flowglad.com"
-        self.client = httpx.AsyncClient()
+        # Shared pooled client from the app lifespan; only close it if we created it
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient()
     
-    async def create_checkout_session(
-        self, 
-        user_id: str, 
-        user_email: str, 
-        success_url: str, 
-        cancel_url: str
-    ) -> Optional[Dict[str, Any]]:
-        """Create a Flowglad checkout session"""
-        
+    def _headers(self, idempotency_key: Optional[str] = None) -> Dict[str, str]:
         headers = {
             "Authorization": f"Bearer {self.secret_key}",
             "Content-Type": "application/json"
         }
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        return headers
+    
+    async def resolve_price_id(self) -> Optional[str]:
+        """Get the Flowglad price for the current demand notice price, creating it only once"""
+        if settings.flowglad_price_id:
+            return settings.flowglad_price_id
         
-        # Create product first (or use existing product ID)
+        price_key = _price_key()
+        if price_key in _catalog:
+            return _catalog[price_key]["price_id"]
+        
+        async with _catalog_lock:
+            if not _catalog:
+                _catalog.update(await asyncio.to_thread(_load_catalog))
+            if price_key in _catalog:
+                return _catalog[price_key]["price_id"]
+            
+            entry = await self._create_product_and_price(price_key)
+            if not entry:
+                return None
+            _catalog[price_key] = entry
+            await asyncio.to_thread(_save_catalog, dict(_catalog))
+            return entry["price_id"]
+    
+    async def _create_product_and_price(self, price_key: str) -> Optional[Dict[str, str]]:
+        # Idempotency keys tie these to the price, so concurrent workers can't create duplicates
         product_data = {
             "name": "NYC Legal Demand Notice",
             "description": "Professional demand notice generation for consumer protection cases"
         }
         
+        product_response = await self.client.post(
+            f"{self.base_url}/products",
+            json=product_data,
+            headers=self._headers(f"lawyeredai-product-{price_key}")
+        )
+        
+        if product_response.status_code not in [200, 201]:
+            print(f"Error creating product: {product_response.text}")
+            return None
+        
+        product = product_response.json()
+        
+        # Create price for the product
+        price_data = {
+            "product_id": product["id"],
+            "unit_amount": int(settings.demand_notice_price * 100),  # Convert to cents
+            "currency": "usd",
+            "billing_scheme": "per_unit"
+        }
+        
+        price_response = await self.client.post(
+            f"{self.base_url}/prices",
+            json=price_data,
+            headers=self._headers(f"lawyeredai-price-{price_key}-{product['id']}")
+        )
+        
+        if price_response.status_code not in [200, 201]:
+            print(f"Error creating price: {price_response.text}")
+            return None
+        
+        price = price_response.json()
+        return {"product_id": product["id"], "price_id": price["id"]}
+    
+    async def create_checkout_session(
+        self, 
+        user_id: str, 
+        user_email: str, 
+        success_url: str, 
+        cancel_url: str,
+        retry_token: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Create a Flowglad checkout session; retries with the same retry_token reuse it"""
+        
         try:
-            # Create or get product
-            product_response = await self.client.post(
-                f"{self.base_url}/products",
-                json=product_data,
-                headers=headers
-            )
-            
-            if product_response.status_code not in [200, 201]:
-                print(f"Error creating product: {product_response.text}")
-                return None
-            
-            product = product_response.json()
-            
-            # Create price for the product
-            price_data = {
-                "product_id": product["id"],
-                "unit_amount": int(settings.demand_notice_price * 100),  # Convert to cents
-                "currency": "usd",
-                "billing_scheme": "per_unit"
-            }
-            
-            price_response = await self.client.post(
-                f"{self.base_url}/prices",
-                json=price_data,
-                headers=headers
-            )
-            
-            if price_response.status_code not in [200, 201]:
-                print(f"Error creating price: {price_response.text}")
+            price_id = await self.resolve_price_id()
+            if not price_id:
                 return None
             
-            price = price_response.json()
-            
             # Create checkout session
             checkout_data = {
                 "line_items": [{
-                    "price_id": price["id"],
+                    "price_id": price_id,
                     "quantity": 1
                 }],
                 "mode": "payment",
@@ -78,10 +179,13 @@ class FlowgladService:
                 }
             }
             
+            # Without a client token every call is a new purchase
+            idempotency_key = checkout_idempotency_key(user_id, retry_token) if retry_token else None
+            
             checkout_response = await self.client.post(
                 f"{self.base_url}/checkout/sessions",
                 json=checkout_data,
-                headers=headers
+                headers=self._headers(idempotency_key)
             )
             
             if checkout_response.status_code not in [200, 201]:
@@ -116,4 +220,5 @@ class FlowgladService:
             return None
     
     async def close(self):
-        await self.client.aclose()
\ No newline at end of file
+        if self._owns_client:
+            await self.client.aclose()
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Local payment-state store.
+Flowglad webhooks record checkout status here so payment checks are answered
+without an upstream call
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from backend.config.settings import settings
+
+# Statuses that will not change again, so the stored copy is authoritative
+FINAL_STATUSES = {"complete", "expired", "failed", "canceled"}
+FINAL_STATUS_SQL = ", ".join(f"'{status}'" for status in sorted(FINAL_STATUSES))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payment_sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    status TEXT NOT NULL,
+    payload TEXT,
+    logged_status TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_payment_sessions_user_id ON payment_sessions(user_id);
+CREATE TABLE IF NOT EXISTS webhook_events (
+    event_id TEXT PRIMARY KEY,
+    received_at REAL NOT NULL
+);
+"""
+
+
+class PaymentStore:
+    """SQLite table of checkout sessions keyed by Flowglad session id"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; callers run us via asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT user_id, status, payload FROM payment_sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        user_id, status, payload = row
+        return {
+            "session_id": session_id,
+            "user_id": user_id,
+            "status": status,
+            "data": json.loads(payload) if payload else {}
+        }
+
+    def record(
+        self,
+        session_id: str,
+        status: str,
+        user_id: Optional[str] = None,
+        data: Optional[dict] = None,
+        event_id: Optional[str] = None
+    ) -> Optional[str]:
+        """Insert or update a session and return its stored status.
+
+        A known user id is never overwritten with None, and a session in a final
+        status keeps it, so late or out-of-order events can't reopen it. With an
+        event_id the webhook delivery is recorded in the same transaction; returns
+        None if that event was already processed.
+        """
+        conn = self._connect()
+        with conn:
+            if event_id is not None:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO webhook_events (event_id, received_at) VALUES (?, ?)",
+                    (event_id, time.time())
+                )
+                if cursor.rowcount == 0:
+                    return None
+            conn.execute(
+                f"""INSERT INTO payment_sessions (session_id, user_id, status, payload, updated_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(session_id) DO UPDATE SET
+                       user_id = COALESCE(excluded.user_id, payment_sessions.user_id),
+                       status = CASE WHEN payment_sessions.status IN ({FINAL_STATUS_SQL})
+                                THEN payment_sessions.status ELSE excluded.status END,
+                       payload = CASE WHEN payment_sessions.status IN ({FINAL_STATUS_SQL})
+                                 THEN payment_sessions.payload ELSE excluded.payload END,
+                       updated_at = excluded.updated_at""",
+                (session_id, user_id, status, json.dumps(data or {}), time.time())
+            )
+            row = conn.execute(
+                "SELECT status FROM payment_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0]
+
+    def claim_log(self, session_id: str, status: str) -> bool:
+        """Return True exactly once per session and status, so each change is logged once"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE payment_sessions SET logged_status = ?
+                   WHERE session_id = ? AND (logged_status IS NULL OR logged_status != ?)""",
+                (status, session_id, status)
+            )
+        return cursor.rowcount == 1
+
+    def release_log(self, session_id: str, status: str):
+        """Undo claim_log after the payments write failed, so the next check retries it"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE payment_sessions SET logged_status = NULL WHERE session_id = ? AND logged_status = ?",
+                (session_id, status)
+            )
+
+
+_payment_store: Optional[PaymentStore] = None
+
+
+def get_payment_store() -> PaymentStore:
+    """Open the payment store on first use"""
+    global _payment_store
+    if _payment_store is None:
+        _payment_store = PaymentStore(settings.payment_store_path)
+    return _payment_store
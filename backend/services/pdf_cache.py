@@ -0,0 +1,110 @@
+"""
+Content-addressed on-disk cache for generated PDFs.
+Files are named by the SHA-256 of the markdown they were rendered from, so
+repeat downloads of the same notice are served straight from disk
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional
+from backend.config.settings import settings
+
+
+def content_key(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class PDFArtifactCache:
+    """Directory of PDFs with a byte-size budget; file mtime doubles as the LRU clock"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> str:
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached PDF, or None; a hit moves the entry to the front of the LRU"""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key: str, pdf: bytes) -> str:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers (and other workers) never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf)
+        existed = os.path.exists(path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if not existed:
+                self._total_bytes += len(pdf)
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str):
+        # Rescan so files written by other workers are counted, then drop least recently used
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+    def stats(self) -> dict:
+        return {
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_pdf_cache: Optional[PDFArtifactCache] = None
+
+
+def get_pdf_cache() -> PDFArtifactCache:
+    """Open the PDF cache directory on first use"""
+    global _pdf_cache
+    if _pdf_cache is None:
+        _pdf_cache = PDFArtifactCache(settings.pdf_cache_dir, settings.pdf_cache_max_bytes)
+    return _pdf_cache
@@ -0,0 +1,254 @@
+"""
+PDF rendering for demand notices.
+ReportLab layout is CPU-bound, so requests render on a pool of warm worker
+processes instead of the event loop
+"""
+
+import asyncio
+import glob
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, FrozenSet, Optional, Tuple
+from backend.config.settings import settings
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Flowable
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+# Per-process caches; each pool worker builds its own on first use
+_styles: Optional[Dict[str, ParagraphStyle]] = None
+_template_lines: Optional[FrozenSet[str]] = None
+_static_flowables: Dict[str, Flowable] = {}
+
+
+def get_styles() -> Dict[str, ParagraphStyle]:
+    """Paragraph styles, built once per process"""
+    global _styles
+    if _styles is None:
+        styles = getSampleStyleSheet()
+        _styles = {
+            "title": ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                fontSize=16,
+                spaceAfter=30,
+                alignment=TA_CENTER
+            ),
+            "heading": ParagraphStyle(
+                'CustomHeading',
+                parent=styles['Heading2'],
+                fontSize=12,
+                spaceBefore=12,
+                spaceAfter=6,
+                textColor='#2c3e50'
+            ),
+            "normal": ParagraphStyle(
+                'CustomNormal',
+                parent=styles['Normal'],
+                fontSize=10,
+                spaceBefore=3,
+                spaceAfter=3,
+                leading=12
+            ),
+        }
+    return _styles
+
+
+class StaticParagraph(Paragraph):
+    """Paragraph that keeps its line breaks between builds, for boilerplate reused across documents"""
+
+    _wrapped: Optional[Tuple[float, Tuple[float, float]]] = None
+
+    def wrap(self, availWidth, availHeight):
+        # Every notice uses the same frame, so the layout from the last build still holds
+        # unless split() threw the line breaks away
+        if self._wrapped is not None and self._wrapped[0] == availWidth and hasattr(self, 'blPara'):
+            return self._wrapped[1]
+        size = super().wrap(availWidth, availHeight)
+        self._wrapped = (availWidth, size)
+        return size
+
+
+class NoticeDocTemplate(SimpleDocTemplate):
+    def afterFlowable(self, flowable):
+        # ReportLab marks a flowable pushed to the next frame and never clears the mark; cached
+        # flowables recur within and across documents, so clear it once the flowable is drawn
+        flowable.__dict__.pop('_postponed', None)
+
+
+def _static_lines() -> FrozenSet[str]:
+    """Template lines with no per-user fields; their flowables are identical for every notice"""
+    global _template_lines
+    if _template_lines is None:
+        lines = set()
+        for path in glob.glob(os.path.join(TEMPLATE_DIR, "*.md.j2")):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if "{{" not in line and "{%" not in line and "{#" not in line:
+                        lines.add(line)
+        _template_lines = frozenset(lines)
+    return _template_lines
+
+
+def _build_flowable(line: str, paragraph=Paragraph) -> Flowable:
+    styles = get_styles()
+    if not line:
+        return Spacer(1, 6)
+    elif line.startswith('# '):
+        # Main title
+        title_text = line[2:].replace('—', '—')  # Em dash
+        return paragraph(title_text, styles["title"])
+    elif line.startswith('## '):
+        # Section heading
+        heading_text = line[3:]
+        return paragraph(f"<b>{heading_text}</b>", styles["heading"])
+    elif line.startswith('- '):
+        # Bullet point (bold or regular)
+        bullet_text = line[2:]
+        return paragraph(f"• {bullet_text}", styles["normal"])
+    elif line.startswith('---'):
+        # Horizontal line
+        return Spacer(1, 12)
+    else:
+        # Regular paragraph
+        return paragraph(line, styles["normal"])
+
+
+def _flowable_for(line: str, reuse: bool) -> Flowable:
+    # Boilerplate lines are parsed and broken into lines once per process; only the
+    # lines carrying per-user fields are parsed and laid out on each request
+    if reuse and line in _static_lines():
+        flowable = _static_flowables.get(line)
+        if flowable is None:
+            flowable = _static_flowables[line] = _build_flowable(line, StaticParagraph)
+        return flowable
+    return _build_flowable(line)
+
+
+def render_pdf(content: str, reuse_flowables: bool = True) -> bytes:
+    """Generate PDF from markdown-style content"""
+    buffer = io.BytesIO()
+    doc = NoticeDocTemplate(buffer, pagesize=letter,
+                          rightMargin=72, leftMargin=72,
+                          topMargin=72, bottomMargin=18)
+
+    story = [_flowable_for(line.strip(), reuse_flowables) for line in content.split('\n')]
+
+    # Build PDF
+    doc.build(story)
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def _warm_worker():
+    # Runs once in each worker process: pay import, style and boilerplate setup before the first request
+    get_styles()
+    for line in _static_lines():
+        _flowable_for(line, reuse=True)
+    render_pdf("# Warmup")
+
+
+def _render_job(content: str, submitted_at: float) -> Tuple[bytes, float, float]:
+    started_at = time.time()
+    pdf = render_pdf(content)
+    return pdf, started_at - submitted_at, time.time() - started_at
+
+
+class PDFPoolSaturated(Exception):
+    """Every worker is busy and the wait queue is full"""
+
+
+class PDFRenderPool:
+    """Bounded ProcessPoolExecutor for PDF rendering, with queue-wait and render-time metrics"""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.RLock()
+        self._in_flight = 0
+        self.restarts = 0
+        self.rendered = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.render_time_total = 0.0
+        self.render_time_max = 0.0
+
+    def start(self):
+        """Spawn the workers now so the first request doesn't pay for it"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+                for _ in range(self.workers):
+                    self._executor.submit(time.sleep, 0.05)
+            return self._executor
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _replace_broken(self, broken: ProcessPoolExecutor):
+        # A worker died (OOM, crash in ReportLab) and the executor refuses all work from then on
+        with self._executor_lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.restarts += 1
+                print("PDF render pool broken by a dead worker; starting a new one")
+            self.start()
+
+    async def render(self, content: str) -> bytes:
+        if self._in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PDFPoolSaturated("PDF rendering is busy")
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self.start()
+            try:
+                pdf, queue_wait, render_time = await loop.run_in_executor(
+                    executor, _render_job, content, time.time()
+                )
+            except BrokenProcessPool:
+                # Retried once on a fresh pool; a render that kills its worker again fails
+                self._replace_broken(executor)
+                pdf, queue_wait, render_time = await loop.run_in_executor(
+                    self.start(), _render_job, content, time.time()
+                )
+        finally:
+            self._in_flight -= 1
+
+        self.rendered += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        self.render_time_total += render_time
+        self.render_time_max = max(self.render_time_max, render_time)
+        return pdf
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "restarts": self.restarts,
+            "rendered": self.rendered,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": self.queue_wait_total / self.rendered * 1000 if self.rendered else 0.0,
+            "queue_wait_max_ms": self.queue_wait_max * 1000,
+            "render_time_avg_ms": self.render_time_total / self.rendered * 1000 if self.rendered else 0.0,
+            "render_time_max_ms": self.render_time_max * 1000,
+        }
+
+
+pdf_render_pool = PDFRenderPool(workers=settings.pdf_workers, max_queue=settings.pdf_max_queue)
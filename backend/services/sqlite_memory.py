@@ -0,0 +1,157 @@
+"""
+SQLite-backed memory service.
+Durable local chat history that every uvicorn worker on the host can share
+without a remote Honcho dependency
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Optional
+from backend.config.settings import settings
+from backend.models.chat import ChatMessage
+from backend.services.write_behind import WriteBehindQueue, PendingMessage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session_timestamp ON messages(session_id, timestamp);
+"""
+
+# Attempts per batch before it's handed back to the write-behind queue for a later flush
+WRITE_ATTEMPTS = 4
+
+# Fixed SQL text so sqlite3's statement cache reuses the prepared statements
+INSERT_SESSION = "INSERT OR IGNORE INTO sessions (session_id, user_id, created_at) VALUES (?, ?, ?)"
+INSERT_MESSAGE = (
+    "INSERT INTO messages (session_id, user_id, role, content, timestamp) VALUES (?, ?, ?, ?, ?)"
+)
+SELECT_RECENT = """
+SELECT role, content, timestamp FROM messages
+WHERE session_id = ?
+ORDER BY timestamp DESC, id DESC
+LIMIT ?
+"""
+
+
+class SqliteMemoryService:
+    """Memory service storing sessions and messages in a WAL-mode SQLite file"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.memory_sqlite_path
+        self._local = threading.local()
+        # Every thread's connection, so close() can release them all
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+        # Inserts are batched per session; reads merge in anything not yet written
+        self.write_queue = WriteBehindQueue(
+            batch_size=settings.memory_batch_size,
+            flush_interval=settings.memory_flush_interval
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; blocking calls run via asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only ever used from its own thread; check_same_thread is off so close() can close it
+            conn = sqlite3.connect(self.path, timeout=10.0, cached_statements=64, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _insert_session_sync(self, session_id: str, user_id: str):
+        conn = self._connect()
+        with conn:
+            conn.execute(INSERT_SESSION, (session_id, user_id, datetime.now().timestamp()))
+
+    def _insert_messages_sync(self, session_id: str, batch: List[PendingMessage]):
+        conn = self._connect()
+        with conn:
+            conn.executemany(INSERT_MESSAGE, [
+                (
+                    session_id,
+                    user_id,
+                    message.role,
+                    message.content,
+                    (message.timestamp or datetime.now()).timestamp()
+                )
+                for user_id, message in batch
+            ])
+
+    def _select_recent_sync(self, session_id: str, limit: int) -> List[ChatMessage]:
+        rows = self._connect().execute(SELECT_RECENT, (session_id, limit)).fetchall()
+        return [
+            ChatMessage(
+                role=role,
+                content=content,
+                timestamp=datetime.fromtimestamp(timestamp)
+            )
+            for role, content, timestamp in reversed(rows)
+        ]
+
+    async def create_session(self, user_id: str) -> str:
+        session_id = f"session_{user_id}_{int(datetime.now().timestamp())}"
+        await asyncio.to_thread(self._insert_session_sync, session_id, user_id)
+        return session_id
+
+    async def add_message(self, user_id: str, session_id: str, message: ChatMessage):
+        if not message.timestamp:
+            message = message.model_copy(update={"timestamp": datetime.now()})
+        self.write_queue.enqueue(session_id, user_id, message, self._write_batch)
+
+    async def _write_batch(self, session_id: str, batch: List[PendingMessage]):
+        """Insert a batch, retrying busy or locked errors; raises so the queue keeps the batch"""
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                await asyncio.to_thread(self._insert_messages_sync, session_id, batch)
+                return
+            except sqlite3.OperationalError as e:
+                # "database is locked" when other workers hold the write lock past the busy timeout
+                if attempt == WRITE_ATTEMPTS - 1:
+                    raise
+                print(f"⚠️ SQLite write failed ({e}), retrying")
+                await asyncio.sleep(0.2 * 2 ** attempt)
+
+    async def get_chat_history(self, user_id: str, session_id: str, limit: int = 10) -> List[ChatMessage]:
+        async with self.write_queue.session_lock(session_id):
+            history = await asyncio.to_thread(self._select_recent_sync, session_id, limit)
+            pending = self.write_queue.pending_messages(session_id)
+
+        if not pending:
+            return history
+        history = history + pending
+        return history[-limit:] if len(history) > limit else history
+
+    async def get_user_context(self, user_id: str, query: str = "") -> str:
+        return "Using SQLite memory service - no advanced context available."
+
+    async def close(self):
+        await self.write_queue.flush_all()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Threads still holding a closed connection open a fresh one if used again
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
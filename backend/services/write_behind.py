@@ -0,0 +1,110 @@
+"""
+Write-behind queue for chat message persistence.
+Messages are buffered per session and flushed to the memory backend in batches
+"""
+
+import asyncio
+import weakref
+from typing import Awaitable, Callable, Dict, List, Tuple
+from backend.models.chat import ChatMessage
+
+PendingMessage = Tuple[str, ChatMessage]  # (user_id, message)
+BatchWriter = Callable[[str, List[PendingMessage]], Awaitable[None]]
+
+
+class WriteBehindQueue:
+    """Batch message writes per session on a size or time trigger, preserving order"""
+
+    def __init__(self, batch_size: int = 20, flush_interval: float = 0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, List[PendingMessage]] = {}
+        self._writers: Dict[str, BatchWriter] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._flushes: set = set()
+        self._closing = False
+        # A session's lock serializes its flushes and lets reads wait out an in-flight batch
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.messages_written = 0
+        self.batches_written = 0
+
+    def session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    def enqueue(self, session_id: str, user_id: str, message: ChatMessage, writer: BatchWriter):
+        """Buffer a message; flushes happen in the background"""
+        pending = self._pending.setdefault(session_id, [])
+        pending.append((user_id, message))
+        self._writers[session_id] = writer
+
+        if len(pending) >= self.batch_size:
+            self._start_flush(session_id)
+        elif session_id not in self._timers:
+            self._timers[session_id] = asyncio.create_task(self._flush_later(session_id))
+
+    def pending_messages(self, session_id: str) -> List[ChatMessage]:
+        """Messages accepted but not yet written, oldest first"""
+        return [message for _, message in self._pending.get(session_id, [])]
+
+    def _start_flush(self, session_id: str):
+        task = asyncio.create_task(self.flush(session_id))
+        # Hold a reference until done so the task isn't garbage collected mid-flush
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush_later(self, session_id: str):
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            self._timers.pop(session_id, None)
+        await self.flush(session_id)
+
+    async def flush(self, session_id: str):
+        """Write everything buffered for a session as one batch"""
+        async with self.session_lock(session_id):
+            batch = list(self._pending.get(session_id, []))
+            if not batch:
+                return
+            writer = self._writers[session_id]
+            try:
+                await writer(session_id, batch)
+            except Exception as e:
+                # A writer that raises hasn't stored the batch: keep it pending and retry later
+                print(f"❌ Error flushing {len(batch)} message(s) for {session_id}, will retry: {e}")
+                if not self._closing and session_id not in self._timers:
+                    self._timers[session_id] = asyncio.create_task(self._flush_later(session_id))
+                return
+            remaining = self._pending.get(session_id, [])[len(batch):]
+            if remaining:
+                self._pending[session_id] = remaining
+            else:
+                self._pending.pop(session_id, None)
+                self._writers.pop(session_id, None)
+            self.messages_written += len(batch)
+            self.batches_written += 1
+
+    async def flush_all(self):
+        """Drain every session, e.g. on shutdown"""
+        # No retries are scheduled while draining; the queue is usable again afterwards
+        self._closing = True
+        try:
+            for timer in list(self._timers.values()):
+                timer.cancel()
+            self._timers.clear()
+            if self._flushes:
+                await asyncio.gather(*self._flushes, return_exceptions=True)
+            await asyncio.gather(*(self.flush(session_id) for session_id in list(self._pending)))
+        finally:
+            self._closing = False
+
+    def stats(self) -> dict:
+        return {
+            "pending_sessions": len(self._pending),
+            "pending_messages": sum(len(items) for items in self._pending.values()),
+            "messages_written": self.messages_written,
+            "batches_written": self.batches_written,
+        }
@@ -106,11 +106,14 @@ class NYCLegalAssistant {
         this.showTypingIndicator(true);
         this.setProcessing(true);
 
+        let assistantMessage = null;
+
         try {
-            const response = await fetch('/api/chat/message', {
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream',
                 },
                 body: JSON.stringify({
                     message: message,
@@ -119,30 +122,82 @@ class NYCLegalAssistant {
                 })
             });
 
-            if (!response.ok) {
+            if (!response.ok || !response.body) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
-            
-            // Update session ID
-            this.sessionId = data.session_id;
-            
-            // Hide typing indicator before showing response
-            this.showTypingIndicator(false);
-            
-            // Add AI response to chat
-            this.addMessage(data.response, 'assistant', data.can_generate_demand_notice);
+            let text = '';
+            let canGenerateDemand = false;
+
+            await this.readEventStream(response, (event, data) => {
+                if (event === 'session') {
+                    // Update session ID
+                    this.sessionId = data.session_id;
+                } else if (event === 'token') {
+                    if (!assistantMessage) {
+                        // Hide typing indicator as soon as the first token arrives
+                        this.showTypingIndicator(false);
+                        assistantMessage = this.addMessage('', 'assistant');
+                    }
+                    text += data.text;
+                    this.renderMessageContent(assistantMessage, text, canGenerateDemand);
+                } else if (event === 'demand_notice' || event === 'done') {
+                    canGenerateDemand = canGenerateDemand || data.can_generate_demand_notice;
+                    if (assistantMessage) {
+                        this.renderMessageContent(assistantMessage, text, canGenerateDemand);
+                    }
+                } else if (event === 'error') {
+                    console.error('Stream error:', data.detail);
+                }
+            });
+
+            if (!assistantMessage) {
+                throw new Error('Empty response stream');
+            }
 
         } catch (error) {
             console.error('Error sending message:', error);
             this.showTypingIndicator(false);
-            this.addMessage('Sorry, I encountered an error. Please try again.', 'assistant');
+            if (!assistantMessage) {
+                this.addMessage('Sorry, I encountered an error. Please try again.', 'assistant');
+            }
         } finally {
             this.setProcessing(false);
         }
     }
 
+    async readEventStream(response, onEvent) {
+        // Minimal SSE parser over a fetch body (EventSource can't POST a JSON body)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                for (const line of rawEvent.split('\n')) {
+                    if (line.startsWith('event:')) {
+                        event = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                }
+                if (data) {
+                    onEvent(event, JSON.parse(data));
+                }
+            }
+        }
+    }
+
     addMessage(content, role, canGenerateDemand = false) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${role}`;
@@ -150,6 +205,14 @@ class NYCLegalAssistant {
         const contentDiv = document.createElement('div');
         contentDiv.className = 'message-content';
         
+        messageDiv.appendChild(contentDiv);
+        this.chatMessages.appendChild(messageDiv);
+        this.renderMessageContent(contentDiv, content, canGenerateDemand && role === 'assistant');
+        
+        return contentDiv;
+    }
+
+    renderMessageContent(contentDiv, content, canGenerateDemand = false) {
         // Convert basic markdown-style formatting
         const formattedContent = content
             .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
@@ -160,7 +223,7 @@ class NYCLegalAssistant {
         contentDiv.innerHTML = `<p>${formattedContent}</p>`;
         
         // Add demand notice button if applicable
-        if (canGenerateDemand && role === 'assistant') {
+        if (canGenerateDemand) {
             const demandButton = document.createElement('button');
             demandButton.className = 'button primary';
             demandButton.textContent = '📝 Generate Demand Notice';
@@ -169,9 +232,6 @@ class NYCLegalAssistant {
             contentDiv.appendChild(demandButton);
         }
         
-        messageDiv.appendChild(contentDiv);
-        this.chatMessages.appendChild(messageDiv);
-        
         // Smooth scroll to bottom
         setTimeout(() => {
             this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
@@ -314,20 +374,32 @@ class NYCLegalAssistant {
         try {
             const demandData = this.getFormData();
             
+            const headers = {
+                'Content-Type': 'application/json',
+            };
+            // Let the server answer 304 if the notice hasn't changed since the last download
+            if (this.lastPDF) {
+                headers['If-None-Match'] = this.lastPDF.etag;
+            }
+
             const response = await fetch('/api/demand-notice/generate-pdf', {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
+                headers,
                 body: JSON.stringify(demandData)
             });
 
-            if (!response.ok) {
+            let blob;
+            if (response.status === 304 && this.lastPDF) {
+                blob = this.lastPDF.blob;
+            } else if (response.ok) {
+                blob = await response.blob();
+                const etag = response.headers.get('ETag');
+                this.lastPDF = etag ? { etag, blob } : null;
+            } else {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
             // Download the PDF file
-            const blob = await response.blob();
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
             a.href = url;
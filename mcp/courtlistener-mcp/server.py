@@ -1,11 +1,31 @@
 #!/usr/bin/env python3
 
 import asyncio
+import html
 import os
-from typing import Any
+import re
+import sqlite3
+import sys
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
 import httpx
 from datetime import datetime
 
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# The BM25 index and case-index search are shared with the backend. Both modules are
+# stdlib-only, so the repo root is all this venv needs; the server runs as a script
+# (see README), so nothing else would put it on the path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+from backend.services.bm25 import BM25Index
+from backend.services.case_search import search_cases
+
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
@@ -13,6 +33,14 @@ import mcp.server.stdio
 
 COURTLISTENER_API_BASE = "https://www.courtlistener.com/api/rest/v4"
 COURTLISTENER_API_TOKEN = os.getenv("COURTLISTENER_API_TOKEN", "")
+# CourtListener throttles per token, so cap how many requests are in flight at once
+COURTLISTENER_MAX_CONCURRENCY = int(os.getenv("COURTLISTENER_MAX_CONCURRENCY", "4"))
+# Local FTS5 index built by `python -m scripts.build_case_index` in the main app
+CASE_INDEX_PATH = os.getenv("CASE_INDEX_PATH", "")
+# Case details are immutable once published, so they're kept for the life of the process
+CASE_DETAILS_CACHE_SIZE = int(os.getenv("CASE_DETAILS_CACHE_SIZE", "256"))
+CASE_TEXT_MAX_CHARS = int(os.getenv("CASE_TEXT_MAX_CHARS", "20000"))
+KNOWLEDGE_BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "kb")
 
 # NY State Court Focus as per design spec
 NY_PRIMARY_COURTS = [
@@ -35,8 +63,156 @@ NY_SECONDARY_COURTS = [
     "ny-ct-app",
 ]
 
+# Field selection keeps each response to what get_case_details prints
+DOCKET_FIELDS = "id,case_name,docket_number,court_id,date_filed,date_terminated,nature_of_suit,cause,assigned_to_str"
+CLUSTER_FIELDS = "id,docket_id,case_name,date_filed,judges,citation_count,precedential_status,citations,syllabus,summary,absolute_url"
+OPINION_FIELDS = "id,type,author_str,per_curiam,page_count"
+OPINION_TEXT_FIELDS = "id,plain_text,html_with_citations"
+
 server = Server("courtlistener-mcp")
 
+# Built in main() before serving; edited files are picked up on later searches
+knowledge_base: BM25Index | None = None
+
+def get_knowledge_base() -> BM25Index:
+    global knowledge_base
+    if knowledge_base is None:
+        knowledge_base = BM25Index(KNOWLEDGE_BASE_DIR)
+    return knowledge_base
+
+# One pooled client for the whole stdio session, so tool calls reuse the TLS connection
+_client: httpx.AsyncClient | None = None
+_request_slots = asyncio.Semaphore(COURTLISTENER_MAX_CONCURRENCY)
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        headers = {}
+        if COURTLISTENER_API_TOKEN:
+            headers["Authorization"] = f"Token {COURTLISTENER_API_TOKEN}"
+        _client = httpx.AsyncClient(
+            base_url=COURTLISTENER_API_BASE,
+            headers=headers,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=COURTLISTENER_MAX_CONCURRENCY,
+                max_keepalive_connections=COURTLISTENER_MAX_CONCURRENCY,
+                keepalive_expiry=120.0
+            ),
+            timeout=httpx.Timeout(30.0, connect=10.0)
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def courtlistener_get(path: str, params: dict[str, Any] | None = None) -> httpx.Response:
+    async with _request_slots:
+        return await get_client().get(path, params=params)
+
+# (kind, id) -> fetch task; concurrent calls for the same case share one request
+_detail_cache: OrderedDict[tuple, asyncio.Task] = OrderedDict()
+
+async def cached_fetch(key: tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    task = _detail_cache.get(key)
+    if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+        task = asyncio.create_task(fetch())
+        _detail_cache[key] = task
+        while len(_detail_cache) > CASE_DETAILS_CACHE_SIZE:
+            _detail_cache.popitem(last=False)
+    else:
+        _detail_cache.move_to_end(key)
+    # Shielded so one caller being cancelled doesn't fail the others waiting on it
+    return await asyncio.shield(task)
+
+async def fetch_json(path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+    response = await courtlistener_get(path, params=params)
+    if response.status_code != 200:
+        raise RuntimeError(f"Status: {response.status_code}, URL: {response.url}, Response: {response.text[:500]}")
+    return response.json()
+
+async def fetch_docket(docket_id: int) -> dict[str, Any]:
+    return await cached_fetch(
+        ("docket", docket_id), lambda: fetch_json(f"/dockets/{docket_id}/", {"fields": DOCKET_FIELDS})
+    )
+
+async def fetch_case(cluster_id: int, docket_id: int | None = None) -> dict[str, Any]:
+    """Cluster, its opinions' metadata and its docket, fetched concurrently"""
+    async def fetch():
+        requests = [
+            fetch_json(f"/clusters/{cluster_id}/", {"fields": CLUSTER_FIELDS}),
+            fetch_json("/opinions/", {"cluster__id": cluster_id, "fields": OPINION_FIELDS}),
+        ]
+        # Search results carry the docket id; without it the docket waits on the cluster
+        if docket_id is not None:
+            requests.append(fetch_docket(docket_id))
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        for result in results[:2]:
+            if isinstance(result, BaseException):
+                raise result
+        cluster, opinions = results[0], results[1].get("results", [])
+        docket = results[2] if docket_id is not None else None
+        if docket is None and cluster.get("docket_id"):
+            try:
+                docket = await fetch_docket(cluster["docket_id"])
+            except Exception as e:
+                docket = e
+        # A missing docket still leaves a usable answer
+        if isinstance(docket, BaseException):
+            docket = None
+        return {"cluster": cluster, "opinions": opinions, "docket": docket}
+
+    return await cached_fetch(("case", cluster_id), fetch)
+
+def opinion_text(opinion: dict[str, Any]) -> str:
+    text = opinion.get("plain_text") or ""
+    if not text and opinion.get("html_with_citations"):
+        markup = re.sub(r"<br\s*/?>|</p>", "\n", opinion["html_with_citations"])
+        text = html.unescape(re.sub(r"<[^>]+>", "", markup))
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+async def fetch_opinion_texts(cluster_id: int) -> dict[int, str]:
+    """Full opinion bodies for a cluster; only requested when include_full_text is set"""
+    async def fetch():
+        data = await fetch_json("/opinions/", {"cluster__id": cluster_id, "fields": OPINION_TEXT_FIELDS})
+        return {opinion["id"]: opinion_text(opinion) for opinion in data.get("results", [])}
+
+    return await cached_fetch(("text", cluster_id), fetch)
+
+def search_local_index(
+    query_terms: list[str], courts: list[str], filed_after: str | None, filed_before: str | None, limit: int
+) -> dict[str, Any] | None:
+    """Search the offline case index, shaped like an API /search/ response; None if unavailable"""
+    if not CASE_INDEX_PATH or not os.path.exists(CASE_INDEX_PATH):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{CASE_INDEX_PATH}?mode=ro", uri=True)
+        try:
+            hits = search_cases(conn, " ".join(query_terms), limit, courts, filed_after, filed_before)
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    if not hits:
+        return None
+
+    results = [
+        {
+            "case_name": hit.case_name,
+            "court": hit.court_id,
+            "date_filed": hit.date_filed,
+            "citation_count": hit.citation_count,
+            "id": hit.opinion_id,
+            "docket": hit.docket_id,
+            "cluster": hit.cluster_id,
+        }
+        for hit in hits
+    ]
+    return {"count": len(results), "results": results}
+
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     return [
@@ -72,6 +248,50 @@ async def handle_list_tools() -> list[types.Tool]:
                 },
                 "required": ["keywords"]
             }
+        ),
+        types.Tool(
+            name="get_case_details",
+            description="Get details for a case from search results: docket, court, judges, citations, summary and opinions. Full opinion text is only included when requested.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "cluster_id": {
+                        "type": "integer",
+                        "description": "Cluster ID from search_cases_by_problem results"
+                    },
+                    "docket_id": {
+                        "type": "integer",
+                        "description": "Docket ID from the same search result, if known (saves a round trip)"
+                    },
+                    "include_full_text": {
+                        "type": "boolean",
+                        "description": "Include the full opinion text (may be large)",
+                        "default": False
+                    }
+                },
+                "required": ["cluster_id"]
+            }
+        ),
+        types.Tool(
+            name="search_knowledge_base",
+            description="Search local NYC Small Claims procedure notes (filing fees, filing steps, courthouse addresses, service of process, common consumer claims, FAQs). Use this for procedural questions before searching case law.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "The procedural question or key terms, e.g. 'filing fee for a $3,000 claim'"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of passages to return",
+                        "minimum": 1,
+                        "maximum": 10,
+                        "default": 3
+                    }
+                },
+                "required": ["query"]
+            }
         )
     ]
 
@@ -100,11 +320,6 @@ async def handle_call_tool(
             
         search_query = " ".join(query_terms)
         
-        # Set up API request
-        headers = {}
-        if COURTLISTENER_API_TOKEN:
-            headers["Authorization"] = f"Token {COURTLISTENER_API_TOKEN}"
-        
         params = {
             "q": search_query,
             "type": "o",
@@ -132,13 +347,20 @@ async def handle_call_tool(
             params["filed_before"] = two_years_ago.strftime("%Y-%m-%d")
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{COURTLISTENER_API_BASE}/search/",
-                    params=params,
-                    headers=headers,
-                    timeout=30.0
+            # NY searches are answered from the offline index when one is configured
+            data = None
+            if jurisdiction == "ny":
+                data = await asyncio.to_thread(
+                    search_local_index,
+                    query_terms,
+                    NY_PRIMARY_COURTS + NY_SECONDARY_COURTS,
+                    params.get("filed_after"),
+                    params.get("filed_before"),
+                    params["page_size"]
                 )
+            
+            if not data or not data.get("results"):
+                response = await courtlistener_get("/search/", params=params)
                 
                 if response.status_code != 200:
                     error_detail = f"Status: {response.status_code}, URL: {response.url}, Response: {response.text[:500]}"
@@ -148,59 +370,153 @@ async def handle_call_tool(
                     )]
                 
                 data = response.json()
-                
-                # Enhanced response formatting per design spec
-                result_text = f"Search Results for Legal Keywords: {', '.join(keywords)}\n"
-                result_text += f"Query: {search_query}\n"
-                result_text += f"Jurisdiction: {jurisdiction.upper()}\n"
-                result_text += f"Case Type: {case_type or 'General'}\n"
-                result_text += f"Date Range: {date_range}\n"
-                result_text += f"Total Found: {data.get('count', 0)} cases\n"
-                result_text += f"Showing: {len(data.get('results', []))} results\n\n"
-                
-                if not data.get('results'):
-                    result_text += "No cases found. Try different keywords or broader search criteria.\n"
-                else:
-                    result_text += "Relevant Cases:\n"
-                    for i, case in enumerate(data.get('results', []), 1):
-                        result_text += f"\n{i}. {case.get('case_name', 'Case name not available')}\n"
-                        result_text += f"   Court: {case.get('court', 'Court not specified')}\n"
-                        result_text += f"   Filed: {case.get('date_filed', 'Date not available')}\n"
-                        result_text += f"   Citation Count: {case.get('citation_count', 0)}\n"
-                        
-                        # Add case IDs for further investigation
-                        if case.get('id'):
-                            result_text += f"   Case ID: {case.get('id')}\n"
-                        if case.get('docket'):
-                            result_text += f"   Docket ID: {case.get('docket')}\n"
-                        if case.get('cluster'):
-                            result_text += f"   Cluster ID: {case.get('cluster')}\n"
-                
-                return [types.TextContent(type="text", text=result_text)]
-                
+            
+            # Enhanced response formatting per design spec
+            result_text = f"Search Results for Legal Keywords: {', '.join(keywords)}\n"
+            result_text += f"Query: {search_query}\n"
+            result_text += f"Jurisdiction: {jurisdiction.upper()}\n"
+            result_text += f"Case Type: {case_type or 'General'}\n"
+            result_text += f"Date Range: {date_range}\n"
+            result_text += f"Total Found: {data.get('count', 0)} cases\n"
+            result_text += f"Showing: {len(data.get('results', []))} results\n\n"
+            
+            if not data.get('results'):
+                result_text += "No cases found. Try different keywords or broader search criteria.\n"
+            else:
+                result_text += "Relevant Cases:\n"
+                for i, case in enumerate(data.get('results', []), 1):
+                    result_text += f"\n{i}. {case.get('case_name', 'Case name not available')}\n"
+                    result_text += f"   Court: {case.get('court', 'Court not specified')}\n"
+                    result_text += f"   Filed: {case.get('date_filed', 'Date not available')}\n"
+                    result_text += f"   Citation Count: {case.get('citation_count', 0)}\n"
+                    
+                    # Add case IDs for further investigation
+                    if case.get('id'):
+                        result_text += f"   Case ID: {case.get('id')}\n"
+                    # API v4 hits use cluster_id/docket_id; local index hits use cluster/docket
+                    docket_id = case.get('docket_id') or case.get('docket')
+                    cluster_id = case.get('cluster_id') or case.get('cluster')
+                    if docket_id:
+                        result_text += f"   Docket ID: {docket_id}\n"
+                    if cluster_id:
+                        result_text += f"   Cluster ID: {cluster_id}\n"
+            
+            return [types.TextContent(type="text", text=result_text)]
+            
         except Exception as e:
             return [types.TextContent(
                 type="text", 
                 text=f"Error searching cases: {str(e)}"
             )]
     
+    elif name == "get_case_details":
+        cluster_id = int(arguments["cluster_id"])
+        docket_id = int(arguments["docket_id"]) if arguments.get("docket_id") else None
+        include_full_text = bool(arguments.get("include_full_text", False))
+        
+        try:
+            if include_full_text:
+                case, texts = await asyncio.gather(
+                    fetch_case(cluster_id, docket_id), fetch_opinion_texts(cluster_id)
+                )
+            else:
+                case, texts = await fetch_case(cluster_id, docket_id), {}
+        except Exception as e:
+            return [types.TextContent(
+                type="text",
+                text=f"Error retrieving case {cluster_id}: {str(e)}"
+            )]
+        
+        cluster, docket, opinions = case["cluster"], case["docket"] or {}, case["opinions"]
+        citations = ", ".join(
+            f"{c.get('volume')} {c.get('reporter')} {c.get('page')}" for c in cluster.get("citations") or []
+        )
+        
+        result_text = f"{cluster.get('case_name') or docket.get('case_name') or 'Case name not available'}\n"
+        result_text += f"Cluster ID: {cluster_id}\n"
+        if docket:
+            result_text += f"Docket ID: {docket.get('id')}\n"
+            result_text += f"Docket Number: {docket.get('docket_number') or 'Not available'}\n"
+            result_text += f"Court: {docket.get('court_id', 'Court not specified')}\n"
+        result_text += f"Filed: {cluster.get('date_filed', 'Date not available')}\n"
+        if docket.get("date_terminated"):
+            result_text += f"Terminated: {docket['date_terminated']}\n"
+        if docket.get("nature_of_suit"):
+            result_text += f"Nature of Suit: {docket['nature_of_suit']}\n"
+        if docket.get("cause"):
+            result_text += f"Cause: {docket['cause']}\n"
+        result_text += f"Judges: {cluster.get('judges') or docket.get('assigned_to_str') or 'Not listed'}\n"
+        result_text += f"Precedential Status: {cluster.get('precedential_status', 'Unknown')}\n"
+        result_text += f"Citation Count: {cluster.get('citation_count', 0)}\n"
+        if citations:
+            result_text += f"Citations: {citations}\n"
+        if cluster.get("absolute_url"):
+            result_text += f"URL: https://www.courtlistener.com{cluster['absolute_url']}\n"
+        for label, key in (("Syllabus", "syllabus"), ("Summary", "summary")):
+            if cluster.get(key):
+                result_text += f"\n{label}:\n{html.unescape(re.sub(r'<[^>]+>', '', cluster[key])).strip()}\n"
+        
+        result_text += f"\nOpinions ({len(opinions)}):\n"
+        budget = CASE_TEXT_MAX_CHARS
+        for i, opinion in enumerate(opinions, 1):
+            author = opinion.get("author_str") or ("Per curiam" if opinion.get("per_curiam") else "Author not listed")
+            result_text += f"\n{i}. Opinion ID: {opinion.get('id')} ({opinion.get('type', 'unknown type')}), {author}\n"
+            text = texts.get(opinion.get("id"), "")
+            if text:
+                # One character budget for the whole response; opinions come back majority first
+                if budget <= 0:
+                    result_text += "[Text omitted: response length limit reached]\n"
+                    continue
+                if len(text) > budget:
+                    text = text[:budget] + "\n[TRUNCATED]"
+                budget -= len(text)
+                result_text += f"{text}\n"
+        if not include_full_text and opinions:
+            result_text += "\nCall again with include_full_text=true for the opinion text.\n"
+        
+        return [types.TextContent(type="text", text=result_text)]
+    
+    elif name == "search_knowledge_base":
+        query = arguments.get("query", "")
+        limit = arguments.get("limit", 3)
+        hits = get_knowledge_base().search(query, limit)
+        
+        if not hits:
+            return [types.TextContent(
+                type="text",
+                text=f"No knowledge base entries match: {query}"
+            )]
+        
+        result_text = f"Knowledge Base Results for: {query}\n"
+        for i, hit in enumerate(hits, 1):
+            result_text += f"\n{i}. {hit.chunk.heading}"
+            if hit.chunk.source:
+                result_text += f" [SRC:{hit.chunk.source}]"
+            result_text += f"\n{hit.chunk.text}\n"
+        
+        return [types.TextContent(type="text", text=result_text)]
+    
     else:
         raise ValueError(f"Unknown tool: {name}")
 
 async def main():
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="courtlistener-mcp",
-                server_version="0.1.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    get_knowledge_base()
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="courtlistener-mcp",
+                    server_version="0.1.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        await close_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Build or update the local NY case-law index from CourtListener bulk data.
+
+Download the dockets, opinion-clusters and opinions dumps from
+https://www.courtlistener.com/help/api/bulk-data/ (CSV, optionally .bz2/.gz;
+JSON and JSON-lines exports with the same field names also work), then:
+
+    python -m scripts.build_case_index ~/Downloads/courtlistener/
+
+Runs entirely offline. Files are loaded dockets first, then clusters, then
+opinions, keeping only rows for the NY courts. Re-running skips files that
+haven't changed and only replaces rows whose date_modified is newer.
+"""
+
+import argparse
+import os
+import time
+
+from backend.config.settings import settings
+from backend.services.case_index import CaseIndex, CSV_FORMATS, INDEX_COURTS, DOCKETS, CLUSTERS, OPINIONS, detect_kind
+
+LOAD_ORDER = {DOCKETS: 0, CLUSTERS: 1, OPINIONS: 2}
+
+
+def collect_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+
+    # Clusters are matched to indexed dockets and opinions to indexed clusters
+    ordered = []
+    for path in files:
+        kind = detect_kind(path)
+        if kind is None:
+            print(f"Skipping {path}: not a dockets, clusters or opinions dump")
+            continue
+        ordered.append((LOAD_ORDER[kind], path, kind))
+    return sorted(ordered)
+
+
+def main(paths, db: str, courts, force: bool, batch_size: int, csv_format: str):
+    index = CaseIndex(db)
+    total = 0
+    for _, path, kind in collect_files(paths):
+        started = time.perf_counter()
+        rows = index.ingest_file(path, kind=kind, courts=courts, force=force, batch_size=batch_size,
+                                  csv_format=csv_format)
+        total += rows
+        print(f"{kind:9s} {rows:9d} rows  {time.perf_counter() - started:7.1f}s  {path}")
+    if total:
+        index.optimize()
+    print(f"Indexed {index.opinion_count()} opinions in {db}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("paths", nargs="+", help="Bulk data files or directories")
+    parser.add_argument("--db", default=settings.case_index_path)
+    parser.add_argument("--court", action="append", dest="courts",
+                        help="Court id to keep (repeatable); defaults to the NY courts")
+    parser.add_argument("--force", action="store_true", help="Re-read files even if unchanged")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction")
+    parser.add_argument("--csv-format", choices=sorted(CSV_FORMATS), default="courtlistener",
+                        help="CSV quoting: CourtListener's backtick dumps or standard double quotes")
+    args = parser.parse_args()
+    main(args.paths, args.db, args.courts or INDEX_COURTS, args.force, args.batch_size, args.csv_format)
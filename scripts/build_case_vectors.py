@@ -0,0 +1,61 @@
+"""
+Embed every case in the local case index for hybrid (keyword + vector) search.
+
+Run after scripts.build_case_index. Uses a small sentence-transformers model
+when installed (EMBEDDING_BACKEND=model|auto), otherwise hashed TF-IDF
+vectors; either way the result is a float32 matrix the backend memory-maps.
+
+    python -m scripts.build_case_vectors --batch-size 256
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from backend.config.settings import settings
+from backend.services.case_index import CaseIndex
+from backend.services.hybrid_search import HashingEmbedder, VectorStore, create_embedder
+
+
+def batched(documents, size):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main(db: str, prefix: str, batch_size: int, max_chars: int):
+    index = CaseIndex(db)
+    embedder = create_embedder()
+    started = time.perf_counter()
+
+    idf = None
+    if isinstance(embedder, HashingEmbedder):
+        # First pass: document frequency per hash bucket
+        df, total = embedder.document_frequencies(text for _, text in index.iter_documents(max_chars))
+        idf = (np.log((1 + total) / (1 + df)) + 1.0).astype(np.float32)
+        embedder.idf = idf
+
+    def batches():
+        for batch in batched(index.iter_documents(max_chars), batch_size):
+            ids = [cluster_id for cluster_id, _ in batch]
+            yield ids, embedder.embed([text for _, text in batch])
+
+    rows = VectorStore.write(prefix, batches(), embedder.dim, embedder.name, idf)
+    print(f"Embedded {rows} cases with {embedder.name} ({embedder.dim} dims) "
+          f"in {time.perf_counter() - started:.1f}s -> {prefix}.f32")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", default=settings.case_index_path)
+    parser.add_argument("--out", default=settings.case_vectors_path, help="Output path prefix")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--max-chars", type=int, default=20000, help="Opinion text embedded per case")
+    args = parser.parse_args()
+    main(args.db, args.out, args.batch_size, args.max_chars)
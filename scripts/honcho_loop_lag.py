@@ -0,0 +1,140 @@
+"""
+Load test: event-loop lag while HonchoService handles concurrent requests.
+
+Simulates a slow Honcho backend with a fake synchronous client and compares
+calling the SDK inline on the event loop (the old behaviour) against running it
+on the bounded Honcho thread pool.
+
+    python -m scripts.honcho_loop_lag --requests 50 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+from backend.models.chat import ChatMessage
+from backend.services.honcho_service import (
+    HonchoService, SessionHistoryStore, shutdown_honcho_executor, message_write_behind
+)
+
+
+class FakeMessage:
+    def __init__(self, peer_id: str, content: str):
+        self.peer_id = peer_id
+        self.content = content
+
+
+class FakePeer:
+    def __init__(self, peer_id: str, latency: float):
+        self.id = peer_id
+        self.latency = latency
+
+    def message(self, content: str) -> FakeMessage:
+        return FakeMessage(self.id, content)
+
+    def chat(self, query: str) -> str:
+        time.sleep(self.latency)
+        return "context"
+
+
+class FakeSession:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def add_peers(self, peers):
+        time.sleep(self.latency)
+
+    def add_messages(self, messages):
+        time.sleep(self.latency)
+
+    def get_messages(self):
+        time.sleep(self.latency)
+        return [FakeMessage("user", "hello"), FakeMessage("assistant", "hi")]
+
+
+class FakeHoncho:
+    """Blocking client with a fixed network round trip per call"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def peer(self, peer_id: str) -> FakePeer:
+        return FakePeer(peer_id, self.latency)
+
+    def session(self, session_id: str) -> FakeSession:
+        return FakeSession(self.latency)
+
+
+def make_service(latency: float) -> HonchoService:
+    service = HonchoService.__new__(HonchoService)
+    service.client = FakeHoncho(latency)
+    service.workspace_id = "load-test"
+    service.fallback_store = SessionHistoryStore()
+    return service
+
+
+async def inline_turn(service: HonchoService, index: int):
+    """What every request did before: blocking SDK calls straight on the loop"""
+    service._get_messages_sync(f"session_{index}")
+    message = ChatMessage(role="user", content="hello")
+    service._add_messages_sync(f"session_{index}", [(f"user_{index}", message)])
+
+
+async def offloaded_turn(service: HonchoService, index: int):
+    await service.get_chat_history(f"user_{index}", f"session_{index}")
+    message = ChatMessage(role="user", content="hello")
+    await service.add_message(f"user_{index}", f"session_{index}", message)
+
+
+async def measure(turn, service: HonchoService, requests: int, interval: float = 0.005) -> dict:
+    """Run `requests` concurrent turns while sampling how late the loop wakes up"""
+    lags = []
+    running = True
+
+    async def monitor():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    monitor_task = asyncio.create_task(monitor())
+    await asyncio.sleep(interval)
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(service, i) for i in range(requests)))
+    await message_write_behind.flush_all()
+    elapsed = time.perf_counter() - start
+    running = False
+    await monitor_task
+
+    lags.sort()
+    return {
+        "wall_s": elapsed,
+        "lag_p50_ms": statistics.median(lags) * 1000,
+        "lag_p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000,
+        "lag_max_ms": lags[-1] * 1000,
+    }
+
+
+async def main(requests: int, latency: float):
+    service = make_service(latency)
+    for label, turn in (("inline (before)", inline_turn), ("thread pool (after)", offloaded_turn)):
+        # Keep the service's per-call logging out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await measure(turn, service, requests)
+        print(
+            f"{label:<20} wall={result['wall_s']:.2f}s "
+            f"lag p50={result['lag_p50_ms']:.1f}ms p99={result['lag_p99_ms']:.1f}ms "
+            f"max={result['lag_max_ms']:.1f}ms"
+        )
+    shutdown_honcho_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated Honcho round trip (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency))
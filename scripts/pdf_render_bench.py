@@ -0,0 +1,63 @@
+"""
+Micro-benchmark: per-PDF render time for a demand notice.
+
+Renders the same generated notice repeatedly in this process, first building
+every flowable from scratch (the old behaviour) and then reusing the cached
+boilerplate flowables.
+
+    python -m scripts.pdf_render_bench --iterations 200
+"""
+
+import argparse
+import statistics
+import time
+
+from backend.models.demand_notice import DemandNoticeRequest
+from backend.services.demand_notice_generator import DemandNoticeGenerator
+from backend.services.pdf_renderer import get_styles, render_pdf
+
+
+def sample_notice() -> str:
+    request = DemandNoticeRequest(
+        user_id="bench",
+        session_id="bench",
+        complainant_name="Jane Doe",
+        complainant_address="123 Main St, Brooklyn, NY 11201",
+        complainant_contact="jane@example.com",
+        respondent_name="Acme Electronics",
+        respondent_address="456 Broadway, New York, NY 10013",
+        issue_description="Purchased a laptop on 2024-03-01 that arrived defective; store refused a refund",
+        amount_claimed="1200",
+        resolution_sought="Full refund"
+    )
+    return DemandNoticeGenerator().generate_notice(request)
+
+
+def measure(content: str, iterations: int, reuse: bool) -> list:
+    render_pdf(content, reuse_flowables=reuse)  # warm up
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        render_pdf(content, reuse_flowables=reuse)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main(iterations: int):
+    content = sample_notice()
+    get_styles()
+    results = {}
+    for label, reuse in (("fresh flowables (before)", False), ("cached flowables (after)", True)):
+        timings = measure(content, iterations, reuse)
+        results[label] = statistics.mean(timings)
+        print(f"{label:26s} mean {statistics.mean(timings):7.2f} ms  "
+              f"median {statistics.median(timings):7.2f} ms  min {min(timings):7.2f} ms")
+    before, after = results.values()
+    print(f"speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,9 @@
+import os
+
+# Settings requires these at import time; tests never talk to the real services
+for name in (
+    "OPENROUTER_API_KEY", "COURTLISTENER_API_KEY", "SUPABASE_ANON_KEY",
+    "SUPABASE_SERVICE_ROLE_KEY", "FLOWGLAD_SECRET_KEY", "SECRET_KEY",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
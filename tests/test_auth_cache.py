@@ -0,0 +1,65 @@
+import time
+
+import jwt
+import pytest
+
+from backend.config.settings import settings
+from backend.services import auth_service
+from backend.services.auth_service import AuthService, token_cache
+
+
+def make_token(exp: float) -> str:
+    # Signed with a key the service doesn't have, so verification falls through to Supabase
+    return jwt.encode({"sub": "user-1", "exp": int(exp), "aud": "authenticated"}, "a-signing-key-the-service-does-not-have", algorithm="HS256")
+
+
+@pytest.fixture
+def service(monkeypatch):
+    token_cache.clear()
+    monkeypatch.setattr(settings, "supabase_jwt_secret", None)
+    monkeypatch.setattr(settings, "auth_check_revocation", False)
+    service = AuthService.__new__(AuthService)
+    service.remote_calls = 0
+
+    async def verify_remotely(token):
+        service.remote_calls += 1
+        return {"user_id": "user-1", "email": None, "user_metadata": {}}
+
+    service._verify_remotely = verify_remotely
+    yield service
+    token_cache.clear()
+
+
+async def test_cache_hit_skips_remote_check(service):
+    token = make_token(time.time() + 600)
+    assert await service.verify_token(token) is not None
+    assert await service.verify_token(token) is not None
+    assert service.remote_calls == 1
+
+
+async def test_cached_token_not_accepted_past_its_exp(service, monkeypatch):
+    now = time.time()
+    token = make_token(now + 1)
+    assert await service.verify_token(token) is not None
+
+    monkeypatch.setattr(auth_service.time, "time", lambda: now + 2.5)
+    await service.verify_token(token)
+    assert service.remote_calls == 2
+
+
+async def test_expired_token_is_never_cached(service):
+    token = make_token(time.time() - 1)
+    await service.verify_token(token)
+    await service.verify_token(token)
+    assert service.remote_calls == 2
+
+
+async def test_revocation_checking_caps_cache_lifetime(service, monkeypatch):
+    monkeypatch.setattr(settings, "auth_check_revocation", True)
+    now = time.time()
+    token = make_token(now + 600)
+    await service.verify_token(token)
+
+    monkeypatch.setattr(auth_service.time, "time", lambda: now + settings.auth_revocation_cache_ttl + 1)
+    await service.verify_token(token)
+    assert service.remote_calls == 2
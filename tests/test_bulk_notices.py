@@ -0,0 +1,92 @@
+import asyncio
+import csv
+import io
+import zipfile
+
+import pytest
+
+from backend.config.settings import settings
+from backend.services import bulk_notices, pdf_cache
+from backend.services.bulk_notices import BulkRequestError, parse_csv, stream_notice_zip
+from backend.services.pdf_cache import PDFArtifactCache
+from backend.services.pdf_renderer import PDFPoolSaturated
+
+DEFAULTS = {"user_id": "user-1", "session_id": "session-1"}
+HEADER = "complainant_name,complainant_address,complainant_contact,respondent_name,respondent_address,amount_claimed,issue_description,resolution_sought\n"
+
+
+def rows(count):
+    return [
+        f"Person {i},1 Main St,p{i}@example.com,Acme,2 Side St,{100 + i},Broken dryer,Refund\n"
+        for i in range(count)
+    ]
+
+
+def read_manifest(data: bytes):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        manifest = archive.read("manifest.csv").decode()
+        names = set(archive.namelist())
+    return list(csv.DictReader(io.StringIO(manifest))), names
+
+
+async def collect(requests):
+    return b"".join([chunk async for chunk in stream_notice_zip(requests, None)])
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    async def no_search(court_service, issue_description):
+        return []
+
+    monkeypatch.setattr(pdf_cache, "_pdf_cache", PDFArtifactCache(str(tmp_path), 1 << 20))
+    monkeypatch.setattr(bulk_notices, "search_case_references", no_search)
+    monkeypatch.setattr(settings, "pdf_retry_after", 0.01)
+
+
+def test_parse_csv_applies_defaults_and_reports_bad_rows():
+    requests = parse_csv((HEADER + "".join(rows(2))).encode(), DEFAULTS)
+    assert [r.complainant_name for r in requests] == ["Person 0", "Person 1"]
+    assert requests[0].user_id == "user-1"
+
+    with pytest.raises(BulkRequestError, match="Row 3"):
+        parse_csv((HEADER + rows(1)[0] + "Person,,,,,,,\n").encode(), DEFAULTS)
+
+
+async def test_concurrent_bulk_requests_all_render_through_saturation(pipeline, monkeypatch):
+    # Pool of 2 workers plus 1 queued: anything beyond that is rejected, as in PDFRenderPool
+    capacity = 3
+    in_flight = 0
+
+    async def render(content):
+        nonlocal in_flight
+        if in_flight >= capacity:
+            raise PDFPoolSaturated("PDF rendering is busy")
+        in_flight += 1
+        try:
+            await asyncio.sleep(0.02)
+            return b"%PDF-" + content.encode()
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(bulk_notices.pdf_render_pool, "render", render)
+    monkeypatch.setattr(bulk_notices, "bulk_render_slots", asyncio.Semaphore(2))
+    first = parse_csv((HEADER + "".join(rows(6))).encode(), DEFAULTS)
+    second = parse_csv((HEADER + "".join(rows(6)).replace("Acme", "Globex")).encode(), DEFAULTS)
+
+    for data in await asyncio.gather(collect(first), collect(second)):
+        manifest, names = read_manifest(data)
+        assert len(manifest) == 6
+        for row in manifest:
+            assert row["error"] == ""
+            assert row["file"] in names
+
+
+async def test_failed_rows_always_carry_an_error(pipeline, monkeypatch):
+    async def render(content):
+        raise RuntimeError()
+
+    monkeypatch.setattr(bulk_notices.pdf_render_pool, "render", render)
+    manifest, names = read_manifest(await collect(parse_csv((HEADER + "".join(rows(2))).encode(), DEFAULTS)))
+    assert names == {"manifest.csv"}
+    assert [row["error"] for row in manifest] == ["RuntimeError", "RuntimeError"]
+    assert all(row["file"] == "" for row in manifest)
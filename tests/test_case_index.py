@@ -0,0 +1,88 @@
+import bz2
+import importlib.util
+import os
+import subprocess
+import sys
+
+from backend.services.case_index import CaseIndex, read_records
+
+SERVER_PATH = os.path.join(os.path.dirname(__file__), "..", "mcp", "courtlistener-mcp", "server.py")
+
+# Rows as CourtListener's PostgreSQL COPY export writes them: every field quoted with
+# backticks, embedded backticks and backslashes escaped with a backslash
+DOCKETS_CSV = (
+    "`id`,`court_id`,`case_name`,`docket_number`,`date_filed`,`date_modified`\n"
+    "`1`,`nyappdiv`,`Smith v. Jones`,`2019-01`,`2019-03-01`,`2020-01-01 00:00:00+00`\n"
+    "`2`,`cal`,`Other v. Court`,`77`,`2019-03-01`,`2020-01-01 00:00:00+00`\n"
+)
+CLUSTERS_CSV = (
+    "`id`,`docket_id`,`case_name`,`date_filed`,`slug`,`precedential_status`,`citation_count`,`date_modified`\n"
+    "`10`,`1`,`Smith v. Jones`,`2019-03-01`,`smith-v-jones`,`Published`,`4`,`2020-01-01 00:00:00+00`\n"
+    "`20`,`2`,`Other v. Court`,`2019-03-01`,`other-v-court`,`Published`,`0`,`2020-01-01 00:00:00+00`\n"
+)
+OPINIONS_CSV = (
+    "`id`,`cluster_id`,`type`,`plain_text`,`date_modified`\n"
+    "`100`,`10`,`010combined`,`The landlord withheld the deposit, citing \"damage\".\n"
+    "Held: the tenant's claim under GOL \\`7-108\\` succeeds; see C:\\\\records.`,`2020-01-01 00:00:00+00`\n"
+    "`200`,`20`,`010combined`,`Unrelated opinion`,`2020-01-01 00:00:00+00`\n"
+)
+
+
+def write_dumps(tmp_path):
+    paths = []
+    for name, text in (("dockets", DOCKETS_CSV), ("opinion-clusters", CLUSTERS_CSV), ("opinions", OPINIONS_CSV)):
+        path = tmp_path / f"{name}-2024-05-06.csv.bz2"
+        path.write_bytes(bz2.compress(text.encode()))
+        paths.append(str(path))
+    return paths
+
+
+def test_reads_courtlistener_csv_quoting(tmp_path):
+    opinions = list(read_records(write_dumps(tmp_path)[2]))
+    assert [record["id"] for record in opinions] == ["100", "200"]
+    assert opinions[0]["plain_text"] == (
+        'The landlord withheld the deposit, citing "damage".\n'
+        "Held: the tenant's claim under GOL `7-108` succeeds; see C:\\records."
+    )
+    assert opinions[0]["date_modified"] == "2020-01-01 00:00:00+00"
+
+
+def test_standard_csv_still_readable(tmp_path):
+    path = tmp_path / "dockets.csv"
+    path.write_text('id,court_id,case_name\n1,ny,"Smith, Jr. v. Jones"\n')
+    assert list(read_records(str(path), "standard")) == [{"id": "1", "court_id": "ny", "case_name": "Smith, Jr. v. Jones"}]
+
+
+def test_ingested_dump_is_searchable(tmp_path):
+    index = CaseIndex(str(tmp_path / "index.sqlite3"))
+    assert [index.ingest_file(path) for path in write_dumps(tmp_path)] == [1, 1, 1]
+
+    cases = index.search("deposit withheld")
+    assert [(case.id, case.cluster_id, case.court) for case in cases] == [("100", "10", "nyappdiv")]
+    assert str(cases[0].date_filed) == "2019-03-01"
+    assert index.search("unrelated") == []
+
+
+def test_mcp_server_searches_the_same_index(tmp_path, monkeypatch):
+    index = CaseIndex(str(tmp_path / "index.sqlite3"))
+    for path in write_dumps(tmp_path):
+        index.ingest_file(path)
+
+    spec = importlib.util.spec_from_file_location("courtlistener_mcp_server", SERVER_PATH)
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    monkeypatch.setattr(server, "CASE_INDEX_PATH", index.path)
+
+    data = server.search_local_index(["deposit", "withheld"], ["nyappdiv", "cal"], None, None, 5)
+    expected = index.search("deposit withheld", courts=["nyappdiv", "cal"])
+    assert [(hit["id"], hit["cluster"], hit["docket"]) for hit in data["results"]] == [
+        (int(case.id), int(case.cluster_id), 1) for case in expected
+    ]
+    assert server.search_local_index(["deposit"], ["cal"], None, None, 5) is None
+
+
+def test_case_search_needs_no_backend_settings():
+    # The MCP server imports it from its own venv, without the backend's env vars
+    code = "import sys, backend.services.case_search; assert 'backend.config.settings' not in sys.modules"
+    root = os.path.join(os.path.dirname(__file__), "..")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=root, env={"PATH": os.environ.get("PATH", "")})
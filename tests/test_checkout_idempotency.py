@@ -0,0 +1,46 @@
+import httpx
+import pytest
+
+from backend.config.settings import settings
+from backend.services.payment_service import FlowgladService, checkout_idempotency_key
+
+
+@pytest.fixture
+def flowglad(monkeypatch):
+    monkeypatch.setattr(settings, "flowglad_price_id", "price_1")
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request.headers.get("Idempotency-Key"))
+        return httpx.Response(201, json={"id": f"cs_{len(sent)}", "url": "https://pay.example/cs"})
+
+    service = FlowgladService(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    service.sent_keys = sent
+    return service
+
+
+async def create(service, retry_token=None, user_id="user-1"):
+    return await service.create_checkout_session(
+        user_id, "a@example.com", "https://app/success", "https://app/cancel", retry_token=retry_token
+    )
+
+
+def test_key_depends_only_on_user_and_token():
+    assert checkout_idempotency_key("user-1", "req-1") == checkout_idempotency_key("user-1", "req-1")
+    assert checkout_idempotency_key("user-1", "req-1") != checkout_idempotency_key("user-1", "req-2")
+    # The same client token from two users must not share an upstream session
+    assert checkout_idempotency_key("user-1", "req-1") != checkout_idempotency_key("user-2", "req-1")
+
+
+async def test_retries_with_same_token_send_same_key(flowglad):
+    await create(flowglad, "req-1")
+    await create(flowglad, "req-1")
+    assert flowglad.sent_keys[0] == flowglad.sent_keys[1] == checkout_idempotency_key("user-1", "req-1")
+
+
+async def test_separate_purchases_are_not_deduplicated(flowglad):
+    await create(flowglad)
+    await create(flowglad)
+    await create(flowglad, "req-2")
+    assert flowglad.sent_keys[:2] == [None, None]
+    assert flowglad.sent_keys[2] == checkout_idempotency_key("user-1", "req-2")
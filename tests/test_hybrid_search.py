@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.config.settings import settings
+from backend.services.case_index import CaseIndex
+from backend.services.hybrid_search import (
+    HashingEmbedder, HybridCaseRetriever, VectorStore, min_similarity, reciprocal_rank_fusion
+)
+
+OPINIONS = {
+    10: ("Smith v. Jones", "The landlord withheld the tenant's security deposit after the lease ended "
+                           "and failed to itemize deductions for damage to the apartment."),
+    20: ("Doe v. Appliance Mart", "The merchant sold a defective clothes dryer and refused a refund "
+                                  "despite the warranty covering the heating element."),
+    30: ("Roe v. Builders Inc", "The contractor abandoned the kitchen renovation unfinished after "
+                                "taking a deposit, and the homeowner sued for breach of contract."),
+    40: ("People v. Green", "The defendant was convicted of burglary in the second degree after "
+                            "entering the dwelling at night."),
+}
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return str(path)
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    index = CaseIndex(str(tmp_path / "index.sqlite3"))
+    index.ingest_file(write_jsonl(tmp_path / "dockets.jsonl", [
+        {"id": cluster_id, "court_id": "nyappdiv", "case_name": name} for cluster_id, (name, _) in OPINIONS.items()
+    ]))
+    index.ingest_file(write_jsonl(tmp_path / "opinion-clusters.jsonl", [
+        {"id": cluster_id, "docket_id": cluster_id, "case_name": name} for cluster_id, (name, _) in OPINIONS.items()
+    ]))
+    index.ingest_file(write_jsonl(tmp_path / "opinions.jsonl", [
+        {"id": cluster_id * 10, "cluster_id": cluster_id, "plain_text": text}
+        for cluster_id, (_, text) in OPINIONS.items()
+    ]))
+
+    # Same steps as scripts/build_case_vectors.py with the hashing embedder
+    embedder = HashingEmbedder(settings.embedding_dim)
+    documents = list(index.iter_documents())
+    df, total = embedder.document_frequencies(text for _, text in documents)
+    embedder.idf = (np.log((1 + total) / (1 + df)) + 1.0).astype(np.float32)
+    prefix = str(tmp_path / "vectors")
+    batch = ([cluster_id for cluster_id, _ in documents], embedder.embed([text for _, text in documents]))
+    VectorStore.write(prefix, [batch], embedder.dim, embedder.name, embedder.idf)
+    vectors = VectorStore(prefix)
+    return HybridCaseRetriever(index, vectors, HashingEmbedder(vectors.meta["dim"], vectors.idf))
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a"], ["b"]], k=60)
+    assert [key for key, _ in fused] == ["b", "a", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61 + 1 / 61)
+
+
+@pytest.mark.parametrize("query", ["quantum chromodynamics gluon", "xyzzy plugh frobnicate", "chocolate cake recipe"])
+def test_unrelated_queries_return_nothing(retriever, query):
+    assert retriever.search(query) == []
+
+
+def test_related_query_ranks_matching_case_first(retriever):
+    cases = retriever.search("landlord kept my security deposit")
+    assert cases[0].cluster_id == "10"
+    assert cases[0].id == "100"
+    # Unrelated cases share no terms and sit below the similarity floor, so they stay out
+    assert "40" not in [case.cluster_id for case in cases]
+
+
+def test_thresholds_follow_the_embedder():
+    assert min_similarity(HashingEmbedder(8)) == settings.hybrid_min_similarity_hashing
+    assert min_similarity(object()) == settings.hybrid_min_similarity_model
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from backend.config.settings import settings
+from backend.models.demand_notice import DemandNoticeRequest
+from backend.services.notice_jobs import (
+    JobStore, NoticeJobQueue, CallbackURLRejected, check_callback_url, QUEUED, RUNNING, COMPLETE
+)
+from backend.services.pdf_renderer import PDFPoolSaturated
+
+REQUEST = {
+    "user_id": "user-1",
+    "session_id": "session-1",
+    "complainant_name": "Jane Doe",
+    "complainant_address": "1 Main St",
+    "complainant_contact": "jane@example.com",
+    "respondent_name": "Acme",
+    "respondent_address": "2 Side St",
+    "amount_claimed": "100",
+    "issue_description": "Broken dryer",
+    "resolution_sought": "Refund",
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_claim_is_exclusive_until_lease_expires(store):
+    store.create("job", "user-1", REQUEST, None)
+    assert store.claim("job", "a", lease=60)
+    assert not store.claim("job", "b", lease=60)
+    assert store.get("job")["status"] == RUNNING
+
+    store.create("stale", "user-1", REQUEST, None)
+    assert store.claim("stale", "dead", lease=-1)
+    assert store.claim("stale", "b", lease=60)
+    # The old owner lost the job and can no longer record an outcome
+    assert not store.finish("stale", "dead", COMPLETE, {})
+    assert store.finish("stale", "b", COMPLETE, {})
+
+
+def test_release_returns_job_to_queue(store):
+    store.create("job", "user-1", REQUEST, None)
+    store.claim("job", "a", lease=60)
+    store.release("job", "a")
+    assert store.get("job")["status"] == QUEUED
+    assert [job["job_id"] for job in store.claimable()] == ["job"]
+
+
+@pytest.mark.parametrize("url", [
+    "http://93.184.216.34/hook",
+    "https://169.254.169.254/latest/meta-data",
+    "https://127.0.0.1/hook",
+    "https://10.1.2.3/hook",
+    "https://[::1]/hook",
+    "https://[::ffff:192.168.0.1]/hook",
+])
+async def test_callback_url_rejected(url):
+    with pytest.raises(CallbackURLRejected):
+        await check_callback_url(url)
+
+
+async def test_public_callback_url_allowed():
+    await check_callback_url("https://93.184.216.34/hook")
+
+
+async def run_queues(store, count, generate, queues=2, wait=1.5):
+    ran = []
+    pool = [NoticeJobQueue(store, workers=2, max_pending_per_user=20) for _ in range(queues)]
+    for index, queue in enumerate(pool):
+        async def run(request, name=index):
+            return await generate(name, ran)
+        queue._generate = run
+        await queue.start()
+    try:
+        job_ids = [await pool[0].submit(DemandNoticeRequest(**REQUEST)) for _ in range(count)]
+        await asyncio.sleep(wait)
+    finally:
+        for queue in pool:
+            await queue.close()
+    return job_ids, ran, pool
+
+
+@pytest.fixture
+def fast_jobs(monkeypatch):
+    monkeypatch.setattr(settings, "notice_job_sweep_interval", 0.1)
+    monkeypatch.setattr(settings, "pdf_retry_after", 0.05)
+
+
+async def test_each_job_runs_once_across_processes(store, fast_jobs):
+    async def generate(name, ran):
+        ran.append(name)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    job_ids, ran, _ = await run_queues(store, 6, generate)
+    assert len(ran) == 6
+    assert all(store.get(job_id)["status"] == COMPLETE for job_id in job_ids)
+
+
+async def test_pool_saturation_is_retried(store, fast_jobs):
+    saturated = {"left": 3}
+
+    async def generate(name, ran):
+        if saturated["left"]:
+            saturated["left"] -= 1
+            raise PDFPoolSaturated()
+        ran.append(name)
+        return {"ok": True}
+
+    job_ids, ran, pool = await run_queues(store, 2, generate, queues=1)
+    assert all(store.get(job_id)["status"] == COMPLETE for job_id in job_ids)
+    assert pool[0].retried == 3
+
+
+async def test_abandoned_job_is_taken_over(store, fast_jobs):
+    store.create("orphan", "user-1", REQUEST, None)
+    store.claim("orphan", "crashed-worker", lease=-1)
+
+    async def generate(name, ran):
+        ran.append(name)
+        return {"ok": True}
+
+    _, ran, _ = await run_queues(store, 0, generate, queues=1, wait=0.3)
+    assert ran == [0]
+    assert store.get("orphan")["status"] == COMPLETE
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api.routes import demand_notice
+from backend.api.routes.demand_notice import _etag_matches
+from backend.services import pdf_cache
+from backend.services.pdf_cache import PDFArtifactCache, content_key
+
+NOTICE = {
+    "user_id": "user-1",
+    "session_id": "session-1",
+    "complainant_name": "Jane Doe",
+    "complainant_address": "1 Main St, New York, NY",
+    "complainant_contact": "jane@example.com",
+    "respondent_name": "Acme Appliances",
+    "respondent_address": "2 Side St, New York, NY",
+    "amount_claimed": "1200",
+    "issue_description": "Refrigerator stopped working after two weeks",
+    "resolution_sought": "Full refund",
+}
+
+
+def test_etag_matching():
+    etag = '"abc"'
+    assert _etag_matches('"abc"', etag)
+    assert _etag_matches('"x", "abc"', etag)
+    assert _etag_matches('W/"abc"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('"abcd"', etag)
+    assert not _etag_matches(None, etag)
+
+
+def test_cache_round_trip(tmp_path):
+    cache = PDFArtifactCache(str(tmp_path), max_bytes=1024)
+    key = content_key("notice")
+    assert cache.get(key) is None
+    path = cache.put(key, b"%PDF-1")
+    assert cache.get(key) == path
+    with open(path, "rb") as f:
+        assert f.read() == b"%PDF-1"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = PDFArtifactCache(str(tmp_path), max_bytes=250)
+    keys = [content_key(str(i)) for i in range(3)]
+    paths = [cache.put(key, b"x" * 100) for key in keys[:2]]
+    # Touch the first entry so the second is now the oldest
+    os.utime(paths[0], (1, 1))
+    os.utime(paths[1], (0, 0))
+    cache.get(keys[0])
+    cache.put(keys[2], b"x" * 100)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "_pdf_cache", PDFArtifactCache(str(tmp_path), 1 << 20))
+    renders = []
+
+    async def render(content):
+        renders.append(content)
+        return b"%PDF-1.4 test"
+
+    monkeypatch.setattr(demand_notice.pdf_render_pool, "render", render)
+    app = FastAPI()
+    app.include_router(demand_notice.router)
+    with TestClient(app) as client:
+        client.renders = renders
+        yield client
+
+
+def test_generate_pdf_serves_etag_and_304(client):
+    first = client.post("/demand-notice/generate-pdf", json=NOTICE)
+    assert first.status_code == 200
+    assert first.content == b"%PDF-1.4 test"
+    etag = first.headers["ETag"]
+
+    unchanged = client.post("/demand-notice/generate-pdf", json=NOTICE, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+
+    # Without a validator the cached file is served, not re-rendered
+    again = client.post("/demand-notice/generate-pdf", json=NOTICE)
+    assert again.status_code == 200
+    assert len(client.renders) == 1
+
+
+def test_changed_notice_gets_new_etag(client):
+    first = client.post("/demand-notice/generate-pdf", json=NOTICE)
+    changed = client.post(
+        "/demand-notice/generate-pdf",
+        json={**NOTICE, "amount_claimed": "1300"},
+        headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]